@@ -0,0 +1,194 @@
+"""
+进程内的 OpenSearch 替身，只实现本项目用到的 HTTP 接口，供基准测试在没有集群的机器上运行。
+
+支持：HEAD / (ping)、GET /、HEAD/PUT/DELETE /{index}、POST /_bulk、POST /{index}/_bulk、
+POST /{index}/_search、POST /_msearch、POST /{index}/_delete_by_query。
+检索只做简单的子串匹配，用来测量客户端和序列化开销，不代表真实集群的检索性能。
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class FakeOpenSearchState:
+    """保存所有索引中的文档"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indices = {} # 索引名 -> {_id: _source}
+        self.next_id = 0
+        self.bulk_requests = 0
+
+    def index(self, index_name, doc_id, source):
+        with self.lock:
+            docs = self.indices.setdefault(index_name, {})
+            if doc_id is None:
+                self.next_id += 1
+                doc_id = f"auto-{self.next_id}"
+            docs[doc_id] = source
+            return doc_id
+
+    def search(self, index_name, body):
+        query = body.get('query', {})
+        size = body.get('size', 10)
+        text = str(next(iter(query.get('match', {}).values()), ''))
+        terms = text.split()
+        with self.lock:
+            docs = list(self.indices.get(index_name, {}).items())
+        hits = []
+        for doc_id, source in docs:
+            content = str(source.get('页内容', ''))
+            matched = [term for term in terms if term in content]
+            if not matched:
+                continue
+            snippet = content[:200]
+            for term in matched:
+                snippet = snippet.replace(term, f"<mark>{term}</mark>")
+            hits.append({'_index': index_name, '_id': doc_id, '_score': float(len(matched)),
+                         '_source': source, 'highlight': {'页内容': [snippet]}})
+            if len(hits) >= size:
+                break
+        return {'took': 0, 'timed_out': False,
+                'hits': {'total': {'value': len(hits), 'relation': 'eq'}, 'hits': hits}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def _send(self, status, body=None):
+        payload = json.dumps(body if body is not None else {}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _parts(self):
+        return [part for part in urlsplit(self.path).path.split('/') if part]
+
+    def do_HEAD(self):
+        parts = self._parts()
+        if not parts:
+            self._send(200)
+        elif len(parts) == 1:
+            self._send(200 if parts[0] in self.state.indices else 404)
+        else:
+            self._send(404)
+
+    def do_GET(self):
+        parts = self._parts()
+        if not parts:
+            self._send(200, {'name': 'fake', 'version': {'distribution': 'opensearch', 'number': '2.11.0'}})
+        elif len(parts) == 2 and parts[1] == '_search':
+            self._send(200, self.state.search(parts[0], json.loads(self._read_body() or b'{}')))
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_PUT(self):
+        parts = self._parts()
+        self._read_body()
+        if len(parts) == 1:
+            with self.state.lock:
+                self.state.indices.setdefault(parts[0], {})
+            self._send(200, {'acknowledged': True, 'index': parts[0]})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts = self._parts()
+        with self.state.lock:
+            existed = self.state.indices.pop(parts[0], None) is not None if len(parts) == 1 else False
+        self._send(200 if existed else 404, {'acknowledged': existed})
+
+    def do_POST(self):
+        parts = self._parts()
+        body = self._read_body()
+        if parts and parts[-1] == '_bulk':
+            self._send(200, self._bulk(parts[0] if len(parts) == 2 else None, body))
+        elif len(parts) == 2 and parts[1] == '_search':
+            self._send(200, self.state.search(parts[0], json.loads(body or b'{}')))
+        elif parts == ['_msearch']:
+            lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+            responses = [self.state.search(header.get('index'), query)
+                         for header, query in zip(lines[::2], lines[1::2])]
+            self._send(200, {'took': 0, 'responses': responses})
+        elif len(parts) == 2 and parts[1] == '_delete_by_query':
+            term = json.loads(body)['query']['term']
+            field, value = next(iter(term.items()))
+            with self.state.lock:
+                docs = self.state.indices.get(parts[0], {})
+                doomed = [doc_id for doc_id, source in docs.items() if source.get(field) == value]
+                for doc_id in doomed:
+                    del docs[doc_id]
+            self._send(200, {'deleted': len(doomed)})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _bulk(self, default_index, body):
+        lines = [line for line in body.splitlines() if line.strip()]
+        items = []
+        i = 0
+        while i < len(lines):
+            action = json.loads(lines[i])
+            op_type, meta = next(iter(action.items()))
+            index_name = meta.get('_index', default_index)
+            if op_type == 'delete':
+                with self.state.lock:
+                    self.state.indices.get(index_name, {}).pop(meta.get('_id'), None)
+                items.append({op_type: {'_index': index_name, '_id': meta.get('_id'), 'status': 200}})
+                i += 1
+                continue
+            doc_id = self.state.index(index_name, meta.get('_id'), json.loads(lines[i + 1]))
+            items.append({op_type: {'_index': index_name, '_id': doc_id, 'status': 201}})
+            i += 2
+        with self.state.lock:
+            self.state.bulk_requests += 1
+        return {'took': 0, 'errors': False, 'items': items}
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenSearch:
+    """
+    在后台线程运行的 OpenSearch 替身。
+
+    用法：
+        with FakeOpenSearch() as fake:
+            client = OSClient(fake.client_config('medical_records'))
+    """
+    def __init__(self, host='127.0.0.1', port=0):
+        self.state = FakeOpenSearchState()
+        handler = type('Handler', (_Handler,), {'state': self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-opensearch', daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_config(self, index_name='medical_records'):
+        """返回可直接传给 OSClient 的配置"""
+        return {'host': self.url, 'user': 'admin', 'password': 'admin', 'index_name': index_name}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,107 @@
+"""
+生成确定性的中文 PDF 测试语料（不依赖第三方库）。
+
+使用 PDF 标准 CJK 字体 STSong-Light + UniGB-UCS2-H 编码，文本以 UCS-2 十六进制写入，
+pdfminer 可以直接提取出原始中文。相同的 seed 生成完全相同的文件。
+"""
+import os
+import random
+
+# 病历常见词汇，用于拼出每页文本
+VOCABULARY = [
+    '患者', '住院', '出院', '诊断', '肺炎', '高血压', '糖尿病', '冠心病', '手术', '麻醉',
+    '护理', '记录', '体温', '血压', '心率', '呼吸', '检查', '化验', '血常规', '尿常规',
+    '影像', '超声', '医嘱', '用药', '抗生素', '静脉', '滴注', '口服', '复查', '随访',
+    '主诉', '现病史', '既往史', '过敏史', '查体', '神志清楚', '病情稳定', '好转', '治愈', '转科',
+]
+DOCUMENT_TYPES = ['病案首页', '入院记录', '病程记录', '手术记录', '出院小结']
+LINES_PER_PAGE = 30
+WORDS_PER_LINE = 12
+
+
+def _page_lines(rng):
+    return [
+        '，'.join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_LINE)) + '。'
+        for _ in range(LINES_PER_PAGE)
+    ]
+
+
+def _content_stream(lines):
+    parts = ['BT', '/F1 12 Tf', '14 TL', '40 800 Td']
+    for line in lines:
+        parts.append(f"<{line.encode('utf-16-be').hex().upper()}> Tj T*")
+    parts.append('ET')
+    return '\n'.join(parts).encode('ascii')
+
+
+def build_pdf(pages):
+    """
+    构造一个 PDF 文件的字节内容。
+
+    Args:
+        pages (list): 每页的文本行列表。
+
+    Returns:
+        bytes: PDF 文件内容。
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # 页面树，最后生成
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /UniGB-UCS2-H "
+        b"/DescendantFonts [4 0 R] >>",
+        b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+        b"/FontDescriptor 5 0 R /DW 1000 >>",
+        b"<< /Type /FontDescriptor /FontName /STSong-Light /Flags 6 /FontBBox [-25 -254 1000 880] "
+        b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>",
+    ]
+    kids = []
+    for lines in pages:
+        stream = _content_stream(lines)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b' '.join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+def generate_corpus(directory, file_count=20, pages_per_file=(1, 10), seed=42):
+    """
+    在 directory 下生成 file_count 个 PDF，文件名为 “住院号_文件类型.pdf”，与 SearchModel.parse_fname 的约定一致。
+
+    Args:
+        directory (str): 输出目录。
+        file_count (int): 文件数。
+        pages_per_file (tuple): 每个文件页数的 (最小, 最大) 范围。
+        seed (int): 随机种子。
+
+    Returns:
+        list: 生成的文件路径。
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(file_count):
+        page_count = rng.randint(*pages_per_file)
+        pages = [_page_lines(rng) for _ in range(page_count)]
+        path = os.path.join(directory, f"{100000 + i}_{rng.choice(DOCUMENT_TYPES)}.pdf")
+        with open(path, 'wb') as f:
+            f.write(build_pdf(pages))
+        paths.append(path)
+    return paths
@@ -0,0 +1,207 @@
+"""
+可复现的性能基准测试。
+
+    python benchmarks/run_benchmarks.py                       # 运行并与 baseline.json 比较
+    python benchmarks/run_benchmarks.py --update-baseline     # 运行并把结果写入 baseline.json
+    python benchmarks/run_benchmarks.py --noop-files 10000    # 缩小无变化重扫的规模
+
+测量项：
+- extract_pages_per_sec: pdfminer 提取合成中文 PDF 的速度
+- bulk_docs_per_sec: OSClient.bulk 写入进程内 OpenSearch 替身的速度（客户端+序列化+HTTP 开销）
+- scan_files_per_sec: FileScanner 端到端扫描合成语料的速度
+- noop_rescan_seconds: 所有文件都已索引时重扫 --noop-files 个文件的耗时
+- peak_rss_mb: 进程峰值常驻内存
+
+基线数值与机器相关，换机器后请先用 --update-baseline 重新生成。
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+from pdf_corpus import generate_corpus  # noqa: E402
+from fake_opensearch import FakeOpenSearch  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+# 指标方向：True 表示越大越好
+HIGHER_IS_BETTER = {
+    'extract_pages_per_sec': True,
+    'bulk_docs_per_sec': True,
+    'scan_files_per_sec': True,
+    'noop_rescan_seconds': False,
+    'peak_rss_mb': False,
+}
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），Windows 上没有 resource 模块时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def bench_extract(paths):
+    from pdf_processor import PDFProcessor
+    processor = PDFProcessor(None)
+    start = time.perf_counter()
+    pages = sum(len(processor.extract_text_with_pdfminer_six(path)) for path in paths)
+    return pages / (time.perf_counter() - start), pages
+
+
+def bench_bulk(fake, doc_count, batch_size=500):
+    from opensearch_client import OSClient
+    client = OSClient(fake.client_config('bench_bulk'))
+    client.create_index()
+    source = {'患者名': '', '住院号': '100000', '文件类型': '病程记录', '文件名称': '100000_病程记录.pdf',
+              '页号': 1, '页内容': '患者住院，诊断肺炎，病情稳定。' * 40}
+    actions = [{'_index': client.index_name, '_source': dict(source, 页号=i)} for i in range(doc_count)]
+    start = time.perf_counter()
+    for i in range(0, doc_count, batch_size):
+        client.bulk(actions[i:i + batch_size])
+    return doc_count / (time.perf_counter() - start)
+
+
+def bench_scan(fake, corpus_dir, work_dir):
+    from opensearch_client import OSClient
+    from db_manager import IndexedFileManager
+    from pdf_processor import PDFProcessor
+    from file_scanner import FileScanner
+    client = OSClient(fake.client_config('bench_scan'))
+    client.create_index()
+    scanner = FileScanner(IndexedFileManager(os.path.join(work_dir, 'scan.db')), PDFProcessor(client))
+    start = time.perf_counter()
+    scanner.scan_and_index_directory(corpus_dir)
+    elapsed = time.perf_counter() - start
+    return scanner.progress.snapshot()['indexed'] / elapsed
+
+
+class _NeverCalledProcessor:
+    """无变化重扫时不应有任何文件被提取"""
+    def index_pdf(self, pdf_path, **kwargs):
+        raise AssertionError(f"unexpected re-index of {pdf_path}")
+
+
+def bench_noop_rescan(work_dir, file_count, files_per_dir=1000):
+    from db_manager import IndexedFileManager
+    from file_scanner import FileScanner
+    tree = os.path.join(work_dir, 'noop_tree')
+    db_path = os.path.join(work_dir, 'noop.db')
+    db_manager = IndexedFileManager(db_path)
+    rows = []
+    for i in range(file_count):
+        directory = os.path.join(tree, f"d{i // files_per_dir:04d}")
+        if i % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{i}_记录.pdf")
+        open(path, 'wb').close()
+        rows.append((path, True, os.path.getmtime(path), time.time()))
+    # 直接批量写入，避免准备阶段本身耗时过长
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT OR REPLACE INTO indexed_files (file_path, success, modification_time, indexed_time) VALUES (?, ?, ?, ?)",
+        rows)
+    conn.commit()
+    conn.close()
+
+    scanner = FileScanner(db_manager, _NeverCalledProcessor())
+    start = time.perf_counter()
+    scanner.scan_and_index_directory(tree)
+    elapsed = time.perf_counter() - start
+    assert scanner.progress.snapshot()['skipped'] == file_count
+    return elapsed
+
+
+def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir, FakeOpenSearch() as fake:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        paths = generate_corpus(corpus_dir, args.files, (args.min_pages, args.max_pages), seed=args.seed)
+
+        results['extract_pages_per_sec'], pages = bench_extract(paths)
+        print(f"extract: {pages} pages from {len(paths)} files, {results['extract_pages_per_sec']:.1f} pages/s")
+
+        results['bulk_docs_per_sec'] = bench_bulk(fake, args.bulk_docs)
+        print(f"bulk: {args.bulk_docs} docs, {results['bulk_docs_per_sec']:.0f} docs/s")
+
+        results['scan_files_per_sec'] = bench_scan(fake, corpus_dir, work_dir)
+        print(f"scan: {results['scan_files_per_sec']:.2f} files/s")
+
+        results['noop_rescan_seconds'] = bench_noop_rescan(work_dir, args.noop_files)
+        print(f"no-op rescan: {args.noop_files} files in {results['noop_rescan_seconds']:.2f} s")
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    if results['peak_rss_mb'] is not None:
+        print(f"peak RSS: {results['peak_rss_mb']:.1f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较，返回退步的指标说明列表"""
+    regressions = []
+    for name, value in results.items():
+        expected = baseline.get('results', {}).get(name)
+        if value is None or expected is None:
+            continue
+        if HIGHER_IS_BETTER[name]:
+            regressed = value < expected * (1 - tolerance)
+        else:
+            regressed = value > expected * (1 + tolerance)
+        status = 'REGRESSION' if regressed else 'ok'
+        print(f"  {name}: {value:.2f} (baseline {expected:.2f}) {status}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 索引基准测试")
+    parser.add_argument('--files', type=int, default=20, help="合成语料的 PDF 文件数")
+    parser.add_argument('--min-pages', type=int, default=1, help="每个文件的最少页数")
+    parser.add_argument('--max-pages', type=int, default=10, help="每个文件的最多页数")
+    parser.add_argument('--bulk-docs', type=int, default=20000, help="bulk 测试写入的文档数")
+    parser.add_argument('--noop-files', type=int, default=100000, help="无变化重扫测试的文件数")
+    parser.add_argument('--seed', type=int, default=42, help="语料随机种子")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="允许相对基线变差的比例")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument('--update-baseline', action='store_true', help="把本次结果写入基线文件")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    results = run(args)
+    params = {key: getattr(args, key) for key in ('files', 'min_pages', 'max_pages', 'bulk_docs', 'noop_files', 'seed')}
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'params': params, 'results': results}, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('params') != params:
+        print(f"Warning: parameters differ from baseline {baseline.get('params')}, comparison may be meaningless.")
+    print("Comparison with baseline:")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+# 需要安装 aiohttp：pip install opensearch-py[async]
+from opensearchpy import AsyncOpenSearch
+from opensearch_client import build_search_body, parse_search_response
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOSClient:
+    """
+    基于 AsyncOpenSearch 的异步检索客户端，供门户等高并发场景在 asyncio 中调用。
+
+    - 所有请求共用一个客户端及其 aiohttp 连接池（大小由 pool_maxsize 控制）。
+    - 并发中的相同查询会合并为一次请求，结果分发给所有等待者。
+    - msearch() 把多个查询放在一次往返中发送。
+    """
+    def __init__(self, config, pool_maxsize=100):
+        self.index_name = config["index_name"]
+        self._inflight = {} # (query, size) -> 正在进行的请求 Future
+        logger.info(f"Creating async OpenSearch client for {config['host']} (pool size {pool_maxsize})")
+        self.os = AsyncOpenSearch(
+            hosts=config["host"],
+            http_auth=(config["user"], config["password"]),
+            # 与 OSClient 相同的 SSL 设置，生产环境请开启证书校验
+            use_ssl=False,
+            verify_certs=False,
+            ssl_assert_hostname=False,
+            ssl_show_warn=False,
+            maxsize=pool_maxsize,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """关闭连接池"""
+        await self.os.close()
+
+    async def search(self, query, size=10):
+        """异步搜索，返回与 OSClient.search 相同结构的页面信息；相同的并发查询只发送一次"""
+        key = (query, size)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._search(query, size))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 某个调用方被取消时不影响共享同一请求的其他调用方
+        results = await asyncio.shield(future)
+        # 每个调用方拿到独立的列表，避免互相修改
+        return [dict(result) for result in results]
+
+    async def _search(self, query, size):
+        try:
+            response = await self.os.search(index=self.index_name, body=build_search_body(query, size))
+            return parse_search_response(response)
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            return []
+
+    async def msearch(self, queries, size=10):
+        """
+        在一次往返中执行多个查询。
+
+        Args:
+            queries (list): 查询字符串列表。
+            size (int): 每个查询返回的最大结果数。
+
+        Returns:
+            list: 与 queries 一一对应的结果列表，单个查询失败时对应位置为空列表。
+        """
+        if not queries:
+            return []
+        body = []
+        for query in queries:
+            body.append({'index': self.index_name})
+            body.append(build_search_body(query, size))
+        try:
+            response = await self.os.msearch(body=body)
+        except Exception as e:
+            logger.error(f"Multi-search error: {e}")
+            return [[] for _ in queries]
+
+        results = []
+        for query, item in zip(queries, response.get('responses', [])):
+            if 'error' in item:
+                logger.error(f"Search error for query {query!r}: {item['error']}")
+                results.append([])
+            else:
+                results.append(parse_search_response(item))
+        return results
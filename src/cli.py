@@ -0,0 +1,212 @@
+# cli.py
+"""
+无界面的命令行入口，适合在 Linux 服务器上作为服务运行。
+
+    python cli.py scan [--dir DIR]              所有根目录各扫描一次后退出
+    python cli.py watch [--dir DIR] [--interval N]  按各根目录的计划持续扫描，收到 SIGINT/SIGTERM 后安全退出
+    python cli.py search 关键词 [--size N] [--suggest]
+    python cli.py rebuild [--dir DIR] --yes     删除索引和扫描记录后重新索引
+    python cli.py profile-report [--top N] [--order-by time|memory|pages|bytes]
+    python cli.py export DIR [--chunk-docs N]   导出索引快照
+    python cli.py import DIR [--streams N] [--recreate --yes]  从快照重建索引
+
+重量级模块（opensearchpy、pdfminer）只在需要时导入，search 命令不会加载 pdfminer。
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+
+from sys_config import SysConfig, CONFIG_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class IndexerService:
+    """组装检索后端、数据库管理器、PDF 处理器和文件扫描器，并负责信号处理与安全停止"""
+    def __init__(self, config):
+        self.config = config
+        self.stop_event = threading.Event()
+        self.scheduler = None
+
+    def build_scheduler(self, directory=None, interval=None):
+        """
+        创建扫描所需的组件（延迟导入 pdf_processor 等模块）。
+
+        未指定 directory 时扫描配置中的全部根目录（app_settings.roots），它们共用提取线程池和 bulk 写入。
+        """
+        from search_client import create_search_client
+        from db_manager import IndexedFileManager
+        from scheduler import build_scheduler, load_roots
+
+        self.search_client = create_search_client(self.config)
+        self.search_client.create_index()
+        self.db_manager = IndexedFileManager(db_path=self.config['database'].get('db_path', 'indexed_files.db'))
+        self.scheduler = build_scheduler(self.config, load_roots(self.config, directory, interval),
+                                         self.search_client, self.db_manager)
+        if self.stop_event.is_set():
+            self.scheduler.stop()
+        return self.scheduler
+
+    def install_signal_handlers(self):
+        """第一次 SIGINT/SIGTERM 请求安全停止（进度已写入断点，下次继续），第二次立即退出"""
+        def handler(signum, frame):
+            if self.stop_event.is_set():
+                logger.warning("Second signal received, exiting immediately.")
+                raise SystemExit(1)
+            logger.info(f"Received signal {signal.Signals(signum).name}, stopping at the next page boundary; progress is checkpointed.")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handler)
+        signal.signal(signal.SIGTERM, handler)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.scheduler:
+            self.scheduler.stop()
+
+    def scan(self, directory=None):
+        self.build_scheduler(directory).scan_once()
+
+    def watch(self, directory=None, interval=None):
+        # 每个根目录按各自的间隔（或 watch 模式）扫描，等待可以被信号立即打断
+        self.build_scheduler(directory, interval).run()
+        logger.info("Watch loop finished.")
+
+    def rebuild(self, directory=None):
+        scheduler = self.build_scheduler(directory)
+        self.search_client.delete_index()
+        self.db_manager.clear_all_records()
+        self.search_client.create_index()
+        scheduler.scan_once()
+
+
+def search(config, query, size, suggest):
+    """执行检索并打印结果，只导入检索后端"""
+    from search_client import create_search_client
+    client = create_search_client(config)
+    if suggest:
+        for result in client.suggest(query, size=size):
+            print(f"{result['住院号']}\t{result['文件名称']}")
+        return
+    for result in client.search(query, size=size):
+        print(f"{result['文件名称']}\t第{result['页号']}页\t{result['score']:.3f}")
+        print(f"    {result['content_snippet']}")
+
+
+def profile_report(config, top_n, order_by):
+    """打印最慢/最占内存的 PDF 列表（需要先开启 profiling 运行过扫描）"""
+    from extraction_profiler import ExtractionProfiler
+    profiler = ExtractionProfiler(config['database'].get('db_path', 'indexed_files.db'), sample_rate=0, track_memory=False)
+    print("seconds\tpages\ts/page\tMB\tpeak MB\tfile\tprofile")
+    for row in profiler.report(top_n, order_by):
+        per_page = f"{row['seconds_per_page']:.2f}" if row['seconds_per_page'] is not None else '-'
+        size_mb = f"{row['bytes'] / 1e6:.1f}" if row['bytes'] is not None else '-'
+        peak_mb = f"{row['peak_memory_bytes'] / 1e6:.1f}" if row['peak_memory_bytes'] is not None else '-'
+        print(f"{row['extract_seconds']:.2f}\t{row['pages']}\t{per_page}\t{size_mb}\t{peak_mb}\t{row['file_path']}\t{row['profile_path'] or ''}")
+
+
+def export_snapshot(config, out_dir, chunk_docs):
+    """导出索引快照（已提取的页面文本和元数据）"""
+    from search_client import create_search_client
+    from snapshot import export_snapshot as export
+    manifest = export(create_search_client(config), out_dir, chunk_docs=chunk_docs)
+    print(f"{manifest['document_count']} documents, {len(manifest['chunks'])} chunks -> {out_dir}")
+
+
+def import_snapshot(config, snapshot_dir, streams, batch_size, recreate):
+    """从快照重建索引，返回是否全部导入成功"""
+    from search_client import create_search_client
+    from snapshot import import_snapshot as load
+    client = create_search_client(config)
+    if recreate:
+        client.delete_index()
+    success_count, error_count = load(client, snapshot_dir, streams=streams, batch_size=batch_size)
+    print(f"{success_count} documents imported, {error_count} errors")
+    return error_count == 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="PDF 全文索引命令行工具")
+    parser.add_argument('--config', default=CONFIG_FILE, help="配置文件路径")
+    parser.add_argument('--log-level', default='INFO', help="日志级别 (DEBUG/INFO/WARNING/ERROR)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = subparsers.add_parser('scan', help="扫描一次目录并索引新增或修改的 PDF")
+    scan_parser.add_argument('--dir', help="PDF 目录，默认扫描配置中的全部根目录（app_settings.roots 或 pdf_directory）")
+
+    watch_parser = subparsers.add_parser('watch', help="持续定期扫描目录，直到收到停止信号")
+    watch_parser.add_argument('--dir', help="PDF 目录，默认扫描配置中的全部根目录（app_settings.roots 或 pdf_directory）")
+    watch_parser.add_argument('--interval', type=int, help="扫描间隔秒数，覆盖各根目录的 interval_seconds")
+
+    search_parser = subparsers.add_parser('search', help="全文检索")
+    search_parser.add_argument('query', help="检索关键词")
+    search_parser.add_argument('--size', type=int, default=10, help="返回结果数")
+    search_parser.add_argument('--suggest', action='store_true', help="按住院号/文件名称前缀联想")
+
+    report_parser = subparsers.add_parser('profile-report', help="列出提取最慢或内存占用最大的 PDF")
+    report_parser.add_argument('--top', type=int, default=20, help="列出的文件数")
+    report_parser.add_argument('--order-by', choices=['time', 'memory', 'pages', 'bytes'], default='time', help="排序依据")
+
+    export_parser = subparsers.add_parser('export', help="把索引中的页面文本和元数据导出为快照")
+    export_parser.add_argument('out_dir', help="快照输出目录")
+    export_parser.add_argument('--chunk-docs', type=int, default=50000, help="每个分块文件的文档数")
+
+    import_parser = subparsers.add_parser('import', help="从快照批量导入索引，无需重新解析 PDF")
+    import_parser.add_argument('snapshot_dir', help="快照目录")
+    import_parser.add_argument('--streams', type=int, default=4, help="并行导入的分块数")
+    import_parser.add_argument('--batch-size', type=int, default=500, help="每个 bulk 请求的文档数")
+    import_parser.add_argument('--recreate', action='store_true', help="导入前删除现有索引（需同时指定 --yes）")
+    import_parser.add_argument('--yes', action='store_true', help="确认删除现有索引")
+
+    rebuild_parser = subparsers.add_parser('rebuild', help="删除索引和扫描记录后重新索引整个目录")
+    rebuild_parser.add_argument('--dir', help="PDF 目录，默认扫描配置中的全部根目录（app_settings.roots 或 pdf_directory）")
+    rebuild_parser.add_argument('--yes', action='store_true', help="确认删除现有索引")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    config = SysConfig.load_config(args.config)
+
+    if args.command == 'search':
+        search(config, args.query, args.size, args.suggest)
+        return 0
+    if args.command == 'profile-report':
+        profile_report(config, args.top, args.order_by)
+        return 0
+    if args.command == 'export':
+        export_snapshot(config, args.out_dir, args.chunk_docs)
+        return 0
+    if args.command == 'import':
+        if args.recreate and not args.yes:
+            logger.error("--recreate deletes the existing index; pass --yes to confirm.")
+            return 2
+        return 0 if import_snapshot(config, args.snapshot_dir, args.streams, args.batch_size, args.recreate) else 1
+
+    directory = args.dir # 未指定时扫描配置中的全部根目录
+    if args.command == 'rebuild' and not args.yes:
+        logger.error("rebuild deletes the existing index; pass --yes to confirm.")
+        return 2
+
+    from metrics import start_metrics
+    start_metrics(config)
+    service = IndexerService(config)
+    service.install_signal_handlers()
+    if args.command == 'scan':
+        service.scan(directory)
+    elif args.command == 'watch':
+        service.watch(directory, args.interval)
+    elif args.command == 'rebuild':
+        service.rebuild(directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -85,6 +85,29 @@ class IndexedFileManager:
             if conn:
                 conn.close()
 
+    def has_record(self, file_path):
+        """
+        检查文件是否有索引记录（不论是否成功、是否已修改），用于判断重新索引前是否需要删除旧文档。
+
+        Args:
+            file_path (str): 文件的完整路径。
+
+        Returns:
+            bool: 有记录时返回 True；数据库出错时也返回 True，宁可多删除一次旧文档。
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM indexed_files WHERE file_path = ?", (file_path,))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error(f"Error checking indexed record: {file_path} - {e}")
+            return True
+        finally:
+            if conn:
+                conn.close()
+
     def mark_as_indexed(self, file_path, success,modification_time):
         """
         标记文件为已索引，存储其路径和修改时间戳。
@@ -135,6 +158,23 @@ class IndexedFileManager:
             if conn:
                 conn.close()
 
+    def clear_all_records(self):
+        """清空所有索引记录（重建索引时使用），返回删除的记录数"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM indexed_files")
+            conn.commit()
+            logger.info(f"Cleared {cursor.rowcount} indexed records.")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error clearing indexed records: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
     def get_all_indexed_files(self):
         """
         获取数据库中所有已索引文件的路径列表。
@@ -0,0 +1,194 @@
+import cProfile
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# report() 支持的排序字段
+REPORT_ORDERS = {
+    'time': 'extract_seconds',
+    'memory': 'peak_memory_bytes',
+    'pages': 'pages',
+    'bytes': 'bytes',
+}
+
+
+class ExtractionProfiler:
+    """
+    可选的 PDF 提取性能分析，用于找出处理特别慢或占用内存特别大的 PDF。
+
+    - 每个文件都记录提取耗时、页数、文件大小和峰值内存（tracemalloc）到 SQLite 的 pdf_profiles 表。
+    - 按 sample_rate 抽样的文件额外用 cProfile 分析，结果保存为 profile_dir 下的 .prof 文件，
+      可用 `python -m pstats xxx.prof` 查看。抽样按路径哈希决定，同一文件每次是否被抽中是固定的。
+
+    tracemalloc 统计的是整个进程的内存，多个文件并行提取时峰值会互相叠加，只能作为参考。
+    """
+    def __init__(self, db_path, sample_rate=0.05, profile_dir='profiles', track_memory=True):
+        self.db_path = db_path
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        self.track_memory = track_memory
+        # cProfile 同一时间只能有一个在运行
+        self._cprofile_lock = threading.Lock()
+        self._create_table()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _get_connection(self):
+        """获取数据库连接"""
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _create_table(self):
+        """创建存储每个文件提取统计的表"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pdf_profiles (
+                    file_path TEXT PRIMARY KEY,
+                    extract_seconds REAL, -- 提取耗时（秒）
+                    pages INTEGER, -- 提取出文本的页数
+                    bytes INTEGER, -- 文件大小
+                    peak_memory_bytes INTEGER, -- 提取期间的峰值内存，未开启时为 NULL
+                    profile_path TEXT, -- cProfile 结果文件，未抽中时为 NULL
+                    profiled_time REAL -- 记录时间戳
+                )
+            ''')
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error creating pdf_profiles table: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def is_sampled(self, pdf_path):
+        """按路径哈希决定是否对该文件做 cProfile 分析"""
+        return zlib.crc32(pdf_path.encode('utf-8')) % 10000 < self.sample_rate * 10000
+
+    @contextmanager
+    def profile(self, pdf_path):
+        """
+        包裹一次提取过程。调用方在 with 块内把页数写入 record['pages']。
+
+        Yields:
+            dict: 本次提取的统计记录。
+        """
+        record = {'pages': 0}
+        profiler = None
+        if self.is_sampled(pdf_path) and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1] - base_memory if self.track_memory else None
+            profile_path = None
+            if profiler:
+                profile_path = self._dump_profile(pdf_path, profiler)
+                self._cprofile_lock.release()
+            self._save(pdf_path, elapsed, record['pages'], peak_memory, profile_path)
+
+    def _dump_profile(self, pdf_path, profiler):
+        name = hashlib.sha1(pdf_path.encode('utf-8')).hexdigest()[:16]
+        profile_path = os.path.join(self.profile_dir, f"{name}.prof")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(profile_path)
+            return profile_path
+        except OSError as e:
+            logger.error(f"Error saving profile for {pdf_path}: {e}")
+            return None
+
+    def _save(self, pdf_path, elapsed, pages, peak_memory, profile_path):
+        try:
+            size = os.path.getsize(pdf_path)
+        except OSError:
+            size = None
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            # 重新提取时保留之前的 profile 文件路径，除非本次生成了新的
+            cursor.execute('''
+                INSERT INTO pdf_profiles (file_path, extract_seconds, pages, bytes, peak_memory_bytes, profile_path, profiled_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_path) DO UPDATE SET
+                    extract_seconds = excluded.extract_seconds,
+                    pages = excluded.pages,
+                    bytes = excluded.bytes,
+                    peak_memory_bytes = excluded.peak_memory_bytes,
+                    profile_path = COALESCE(excluded.profile_path, pdf_profiles.profile_path),
+                    profiled_time = excluded.profiled_time
+            ''', (pdf_path, elapsed, pages, size, peak_memory, profile_path, time.time()))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving extraction profile for {pdf_path}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def report(self, top_n=20, order_by='time'):
+        """
+        返回最慢（或内存、页数、体积最大）的前 top_n 个 PDF。
+
+        Args:
+            top_n (int): 返回的文件数。
+            order_by (str): 'time'、'memory'、'pages' 或 'bytes'。
+
+        Returns:
+            list: 每个文件的统计 dict，另含每页耗时 seconds_per_page。
+        """
+        column = REPORT_ORDERS[order_by]
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT file_path, extract_seconds, pages, bytes, peak_memory_bytes, profile_path
+                FROM pdf_profiles
+                WHERE {column} IS NOT NULL
+                ORDER BY {column} DESC
+                LIMIT ?
+            ''', (top_n,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            for row in rows:
+                row['seconds_per_page'] = row['extract_seconds'] / row['pages'] if row['pages'] else None
+            return rows
+        except sqlite3.Error as e:
+            logger.error(f"Error building profile report: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+
+def create_profiler(config):
+    """根据配置中的 profiling 节创建 ExtractionProfiler，未启用时返回 None"""
+    profiling_config = config.get('profiling', {})
+    if not profiling_config.get('enabled'):
+        return None
+    profiler = ExtractionProfiler(
+        db_path=config['database'].get('db_path', 'indexed_files.db'),
+        sample_rate=profiling_config.get('sample_rate', 0.05),
+        profile_dir=profiling_config.get('profile_dir', 'profiles'),
+        track_memory=profiling_config.get('track_memory', True),
+    )
+    logger.info(f"Extraction profiling enabled (sample rate {profiler.sample_rate:.1%}, profiles in {profiler.profile_dir})")
+    return profiler
@@ -1,16 +1,49 @@
 import os
+import fnmatch
 import logging
+import queue
+import threading
+import time
 from db_manager import IndexedFileManager
+from pdf_processor import ScanCancelled
+from progress import ScanProgress
+from scan_checkpoint import ScanCheckpointManager
+from throttle import AdaptiveController
+from work_queue import PriorityWorkQueue
+from metrics import STAGE_SECONDS, STAGE_ERRORS, FILES_TOTAL, INDEX_LAG_SECONDS, PENDING_FILES, LAST_SCAN_COMPLETED
 
 
 
 logger = logging.getLogger(__name__)
 
+# 遍历时每发现这么多待处理文件，或每隔这么多秒，写一次断点
+CHECKPOINT_EVERY_FILES = 500
+CHECKPOINT_EVERY_SECONDS = 5
+
 class FileScanner:
-    def __init__(self, db_manager: IndexedFileManager, pdf_processor): # Pass the PDFProcessor instance
+    def __init__(self, db_manager: IndexedFileManager, pdf_processor, progress=None, checkpoints=None, controller=None, work_queue=None, leases=None,
+                 include=None, exclude=None, worker_share=1.0): # Pass the PDFProcessor instance
         self.db_manager = db_manager
         self.pdf_processor = pdf_processor # Needs an instance of PDFProcessor
-        self._stop_scanning = False
+        self._stop_event = threading.Event()
+        # 进度计数器，供界面显示吞吐量和预计完成时间；PDFProcessor 通过它上报页数
+        self.progress = progress or ScanProgress()
+        # 扫描断点，默认与已索引文件记录存放在同一个数据库
+        self.checkpoints = checkpoints or ScanCheckpointManager(db_manager.db_path)
+        # 自适应并发控制：提取线程数、同时进行的 bulk 请求数和读取限速
+        self.controller = controller or AdaptiveController()
+        self.pdf_processor.controller = self.controller
+        # 遍历与处理之间的有界优先队列，决定文件的处理顺序
+        self.work_queue = work_queue if work_queue is not None else PriorityWorkQueue()
+        # 多节点索引时的文件租约（LeaseManager），为 None 时本节点处理所有文件
+        self.leases = leases
+        # 相对扫描根目录的路径匹配规则：exclude 命中的目录和文件跳过；设置 include 时只处理命中的文件。
+        # 匹配不区分大小写（与只认 .pdf 扩展名时一致），*.pdf 也匹配 NAS 上的 *.PDF
+        self.include = [pattern.lower() for pattern in include or []]
+        self.exclude = [pattern.lower() for pattern in exclude or []]
+        # 多个根目录共用提取线程池时，本扫描器最多占用的比例
+        self.worker_share = worker_share
+        self._root_label = ''
 
     def scan_and_index_directory(self, directory_path):
         """
@@ -24,81 +57,349 @@ class FileScanner:
             return
 
         logger.info(f"Starting scan and index for directory: {directory_path}")
-        processed_count = 0
-        skipped_count = 0
-        error_count = 0
 
         # TODO: Add logic here to handle potential deletion of files from DB/OpenSearch
         # based on files that are in the DB but not found on the filesystem.
         # This requires getting all files from DB first, then iterating files on disk,
         # and finally checking which DB files were not encountered.
 
-        for root, _, files in os.walk(directory_path):
-            if self._stop_scanning:
-                logger.info("Scanning stopped by user request.")
-                break
+        # 断点以绝对路径区分不同的扫描根目录；多节点共用数据库时每个节点有各自的扫描会话
+        root_key = os.path.abspath(directory_path)
+        self._root_label = root_key
+        if self.leases:
+            root_key = f"{root_key}@{self.leases.node_id}"
+            self.leases.start()
 
-            for file in files:
-                if self._stop_scanning:
-                     logger.info("Scanning stopped by user request.")
-                     break
-
-                if file.lower().endswith('.pdf'):
-                    pdf_path = os.path.join(root, file)
-
-                    try:
-                        # 获取文件的最后修改时间
-                        modification_time = os.path.getmtime(pdf_path)
-
-                        # 检查文件是否需要索引（新文件或修改文件）
-                        if not self.db_manager.is_indexed(pdf_path, modification_time):
-                            logger.info(f"Processing file: {pdf_path}")
-
-                            # --- 在这里调用 PDF 文本提取和 OpenSearch 索引逻辑 ---
-                            # 这部分应该由传入的 pdf_processor 实例来完成
-                            # pdf_processor.index_pdf(pdf_path) 方法应该包含提取和bulk索引的逻辑
-                            # 您可能需要从文件名解析患者信息等，这取决于您的 SearchDocument 结构
-
-                            # 示例调用 (假设 pdf_processor 有 index_pdf 方法)
-                            # 您可能需要根据实际情况调整 index_pdf 的参数
-                            # 例如，如果 patient_info 需要从文件名解析，可以在这里处理
-                            # patient_info = self._parse_patient_info_from_path(pdf_path) # 实现这个方法
-                            # success = self.pdf_processor.index_pdf(pdf_path, patient_info) # 传递patient_info
-
-                            # 简化的调用，假设 index_pdf 自己处理从文件名获取 info 或只需要 path
-                            success = self.pdf_processor.index_pdf(pdf_path)
-                            # 标记文件为已索引
-                            self.db_manager.mark_as_indexed(pdf_path, success, modification_time)
-                            if success:
-                                processed_count += 1
-                            else:
-                                logger.error(f"Failed to index file: {pdf_path}")
-                                error_count += 1
-                        else:
-                            # 文件已索引且未修改，跳过
-                            # logger.debug(f"Skipping already indexed file: {pdf_path}")
-                            skipped_count += 1
-
-                    except FileNotFoundError:
-                        # 文件在扫描后但在处理前被删除，跳过
-                        logger.warning(f"File not found during processing (might have been deleted): {pdf_path}")
-                        # 可以选择从数据库中移除此记录 if needed
-                        # self.db_manager.remove_indexed_record(pdf_path)
-                        error_count += 1 # 视为处理过程中的错误/异常情况
-                    except Exception as e:
-                        # 处理文件时发生其他错误（如PDF解析错误，OpenSearch连接错误等）
-                        logger.error(f"Error processing file {pdf_path}: {e}")
-                        error_count += 1
-                        # 这里的错误处理取决于需求，是否重试、记录失败日志等
+        # 遍历线程把需要索引的文件（新文件或已修改文件）送入有界优先队列，工作线程同时按优先级取出处理；
+        # 队列满时遍历暂停，新文件不必等整棵目录树遍历完
+        self.progress.start_scan(directory_path)
+        self.work_queue.reopen()
+        discovery = threading.Thread(target=self._run_discovery, args=(directory_path, root_key),
+                                     name="discovery", daemon=True)
+        discovery.start()
+        # 并发数由 AdaptiveController 动态调整，多个根目录共用它的名额
+        worker_count = max(1, round(self.controller.max_workers * self.worker_share))
+        workers = [
+            threading.Thread(target=self._worker, args=(root_key,), name=f"indexer-{i}", daemon=True)
+            for i in range(worker_count)
+        ]
+        for worker in workers:
+            worker.start()
+        discovery.join()
+        for worker in workers:
+            worker.join()
+        if self.leases:
+            self.leases.stop()
 
+        if self._stop_event.is_set():
+            logger.info("Scanning stopped by user request. Progress is checkpointed and will resume on next scan.")
+        else:
+            self.checkpoints.finish_session(root_key)
+            LAST_SCAN_COMPLETED.set(time.time(), root=self._root_label)
+        PENDING_FILES.set(0, root=self._root_label)
+        self.progress.set_state('idle')
 
+        snap = self.progress.snapshot()
         logger.info(f"Scan and index finished for directory: {directory_path}")
-        logger.info(f"Processed: {processed_count}, Skipped (already indexed): {skipped_count}, Errors: {error_count}")
+        logger.info(f"Processed: {snap['indexed']}, Skipped (already indexed): {snap['skipped']}, Errors: {snap['errors']}")
+
+    def _run_discovery(self, directory_path, root_key):
+        try:
+            self._discover(directory_path, root_key)
+        except Exception as e:
+            logger.error(f"Error walking directory {directory_path}: {e}")
+        finally:
+            # 通知工作线程：处理完队列中剩余的文件后退出
+            self.work_queue.close()
+            if not self._stop_event.is_set():
+                self.progress.set_state('indexing')
+
+    def _worker(self, root_key):
+        """工作线程：在并发名额内不断从队列取文件处理，遍历结束且队列为空或收到停止请求时退出"""
+        while not self._stop_event.is_set():
+            # 带超时等待名额和队列，保证停止请求能及时生效
+            if not self.controller.workers.acquire(timeout=0.5):
+                continue
+            try:
+                try:
+                    entry = self.work_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if entry is None:
+                    return
+                self._process_file(root_key, *entry)
+            finally:
+                self.controller.workers.release()
+
+    def _process_file(self, root_key, pdf_path, modification_time, size):
+        self.progress.file_started(pdf_path)
+        if self.leases and not self._claim(pdf_path, modification_time):
+            # 其他节点正在处理或已经索引了该文件；若该节点宕机，租约过期后下次扫描会重新发现
+            self.progress.file_handed_off(pdf_path, size)
+            PENDING_FILES.set(self.progress.snapshot()['pending'], root=self._root_label)
+            self.checkpoints.remove_pending(root_key, pdf_path)
+            return
+        start = time.perf_counter()
+        try:
+            # 按配置的 NAS 读取带宽限速
+            self.controller.throttle_read(size, self._stop_event)
+            if self._stop_event.is_set():
+                raise ScanCancelled(f"Scan stopped before {pdf_path}")
+            success = self._index_file(pdf_path, modification_time)
+        except ScanCancelled:
+            # 停止请求打断了提取，文件保留在断点队列中，下次继续
+            logger.info(f"Indexing interrupted, will resume later: {pdf_path}")
+            self.progress.file_abandoned(pdf_path)
+            if self.leases:
+                self.leases.release(pdf_path)
+            return
+
+        self.controller.record_file(time.perf_counter() - start)
+        self.progress.file_finished(pdf_path, success, size)
+        FILES_TOTAL.inc(result='indexed' if success else 'failed')
+        PENDING_FILES.set(self.progress.snapshot()['pending'], root=self._root_label)
+        self.checkpoints.remove_pending(root_key, pdf_path)
+        if self.leases:
+            self.leases.release(pdf_path)
+
+    def _claim(self, pdf_path, modification_time):
+        """获得文件租约；取得租约后再检查一次，文件可能刚被其他节点索引完成"""
+        if not self.leases.claim(pdf_path):
+            logger.debug(f"File is leased by another node: {pdf_path}")
+            return False
+        if self.db_manager.is_indexed(pdf_path, modification_time):
+            self.leases.release(pdf_path)
+            return False
+        return True
+
+    def _discover(self, directory_path, root_key):
+        """
+        遍历目录，把需要索引的文件 (path, mtime, size) 送入工作队列。
+
+        如果该目录有未完成的扫描会话，先恢复断点队列中的文件，再从上次遍历到的位置继续；
+        置顶目录（work_queue.pinned_directories）先于其余目录遍历；
+        遍历过程中定期把新发现的文件和遍历位置写入断点。
+        """
+        position = None
+        resumed = set() # 从断点恢复的文件，遍历置顶目录时不再重复加入
+        session = self.checkpoints.load_session(root_key)
+        if session:
+            logger.info(f"Resuming interrupted scan of {directory_path}: {len(session['pending'])} queued files, "
+                        f"directory walk {'finished' if session['walk_done'] else 'in progress'}.")
+            for pdf_path, _, _ in session['pending']:
+                entry = self._check_file(pdf_path)
+                if not entry:
+                    # 文件已被删除或已被索引，不再需要处理
+                    self.checkpoints.remove_pending(root_key, pdf_path)
+                    continue
+                resumed.add(pdf_path)
+                if not self._enqueue(entry):
+                    return
+            if session['walk_done']:
+                return
+            position = session['walk_position']
+        else:
+            self.checkpoints.start_session(root_key)
+
+        root_path = os.path.abspath(directory_path)
+        pinned = set(path for path in self.work_queue.pinned_directories
+                     if path.startswith(root_path + os.sep) and os.path.isdir(path))
+        for pinned_dir in sorted(pinned):
+            # 用扫描根目录拼出路径，保证与正常遍历时记录的文件路径一致
+            found = []
+            for root, dirs, files in _timed_walk(os.path.join(directory_path, os.path.relpath(pinned_dir, root_path))):
+                dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) not in pinned
+                                 and not self._excluded(directory_path, os.path.join(root, d)))
+                dir_found = self._queue_directory(directory_path, root, files, resumed)
+                if dir_found is None:
+                    break
+                found.extend(dir_found)
+                if len(found) >= CHECKPOINT_EVERY_FILES:
+                    self.checkpoints.add_pending(root_key, found)
+                    found = []
+            # 置顶目录不推进遍历位置，只把发现的文件加入断点队列
+            self.checkpoints.add_pending(root_key, found)
+            if self._stop_event.is_set():
+                return
+
+        found = [] # 尚未写入断点的新发现文件
+        last_dir = None
+        last_checkpoint = time.time()
+        for root, dirs, files in _timed_walk(directory_path):
+            if self._stop_event.is_set():
+                break
+
+            rel = _relative_parts(directory_path, root)
+            # 排序后遍历顺序固定，断点位置才有意义；置顶目录已经遍历过
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) not in pinned
+                             and not self._excluded(directory_path, os.path.join(root, d)))
+            if position is not None:
+                # 跳过整棵已遍历完的子树；包含断点位置的目录仍需进入
+                dirs[:] = [d for d in dirs if not _subtree_done(rel + (d,), position)]
+                if rel <= position:
+                    continue
+
+            dir_found = self._queue_directory(directory_path, root, files, resumed)
+            if dir_found is None:
+                # 中途停止的目录不计入断点，下次重新检查
+                break
 
+            found.extend(dir_found)
+            last_dir = rel
+            if len(found) >= CHECKPOINT_EVERY_FILES or time.time() - last_checkpoint >= CHECKPOINT_EVERY_SECONDS:
+                self.checkpoints.checkpoint_directory(root_key, last_dir, found)
+                found = []
+                last_checkpoint = time.time()
+
+        if last_dir is not None:
+            self.checkpoints.checkpoint_directory(root_key, last_dir, found)
+        if not self._stop_event.is_set():
+            self.checkpoints.mark_walk_done(root_key)
+
+    def _queue_directory(self, directory_path, root, files, resumed):
+        """检查一个目录中的 PDF 文件并送入工作队列，返回发现的文件列表；途中收到停止请求返回 None"""
+        found = []
+        for file in sorted(files):
+            if self._stop_event.is_set():
+                return None
+            if not file.lower().endswith('.pdf'):
+                continue
+            pdf_path = os.path.join(root, file)
+            if pdf_path in resumed or not self._included(directory_path, pdf_path):
+                continue
+            entry = self._check_file(pdf_path)
+            if entry:
+                if not self._enqueue(entry):
+                    return None
+                found.append(entry)
+        if found:
+            PENDING_FILES.set(self.progress.snapshot()['pending'], root=self._root_label)
+        return found
+
+    def _excluded(self, directory_path, path):
+        if not self.exclude:
+            return False
+        rel = os.path.relpath(path, directory_path).replace(os.sep, '/').lower()
+        return any(fnmatch.fnmatchcase(rel, pattern) for pattern in self.exclude)
+
+    def _included(self, directory_path, path):
+        if not self.include:
+            return not self._excluded(directory_path, path)
+        if self._excluded(directory_path, path):
+            return False
+        rel = os.path.relpath(path, directory_path).replace(os.sep, '/').lower()
+        return any(fnmatch.fnmatchcase(rel, pattern) for pattern in self.include)
+
+    def _enqueue(self, entry):
+        """送入工作队列，队列满时等待（可被停止请求打断），返回是否成功"""
+        while not self._stop_event.is_set():
+            try:
+                self.work_queue.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _check_file(self, pdf_path):
+        """检查单个文件，需要索引时返回 (path, mtime, size)，否则返回 None"""
+        try:
+            # 获取文件的最后修改时间和大小
+            with STAGE_SECONDS.time(stage='stat'):
+                stat = os.stat(pdf_path)
+        except FileNotFoundError:
+            # 文件在遍历后被删除，跳过
+            logger.warning(f"File not found during scanning (might have been deleted): {pdf_path}")
+            STAGE_ERRORS.inc(stage='stat')
+            return None
+        except OSError as e:
+            # 权限不足、网络共享断开等，跳过这个文件，不中断整个扫描
+            logger.error(f"Cannot stat file {pdf_path}: {e}")
+            STAGE_ERRORS.inc(stage='stat')
+            return None
+
+        # 检查文件是否需要索引（新文件或修改文件）
+        with STAGE_SECONDS.time(stage='is_indexed'):
+            indexed = self.db_manager.is_indexed(pdf_path, stat.st_mtime)
+        if indexed:
+            # 文件已索引且未修改，跳过
+            # logger.debug(f"Skipping already indexed file: {pdf_path}")
+            self.progress.file_seen(False)
+            FILES_TOTAL.inc(result='skipped')
+            return None
+        self.progress.file_seen(True, stat.st_size)
+        return (pdf_path, stat.st_mtime, stat.st_size)
+
+    def _index_file(self, pdf_path, modification_time):
+        """提取并索引一个文件，返回是否成功；停止请求会以 ScanCancelled 抛出"""
+        try:
+            logger.info(f"Processing file: {pdf_path}")
+
+            # --- 在这里调用 PDF 文本提取和 OpenSearch 索引逻辑 ---
+            # 这部分应该由传入的 pdf_processor 实例来完成
+            # pdf_processor.index_pdf(pdf_path) 方法应该包含提取和bulk索引的逻辑
+            # 您可能需要从文件名解析患者信息等，这取决于您的 SearchDocument 结构
+            # PDFProcessor 在每页之间检查停止标志，停止请求能在一秒内生效
+            # 以前索引过的文件（已修改或上次失败）先删除旧文档再写入
+            success = self.pdf_processor.index_pdf(pdf_path, progress=self.progress,
+                                                   should_stop=self._stop_event.is_set,
+                                                   replace=self.db_manager.has_record(pdf_path))
+            # 标记文件为已索引
+            with STAGE_SECONDS.time(stage='mark_indexed'):
+                self.db_manager.mark_as_indexed(pdf_path, success, modification_time)
+            if success:
+                INDEX_LAG_SECONDS.observe(max(time.time() - modification_time, 0))
+            else:
+                logger.error(f"Failed to index file: {pdf_path}")
+            return success
+
+        except ScanCancelled:
+            raise
+        except FileNotFoundError:
+            # 文件在扫描后但在处理前被删除，跳过
+            logger.warning(f"File not found during processing (might have been deleted): {pdf_path}")
+            # 可以选择从数据库中移除此记录 if needed
+            # self.db_manager.remove_indexed_record(pdf_path)
+            return False # 视为处理过程中的错误/异常情况
+        except Exception as e:
+            # 处理文件时发生其他错误（如PDF解析错误，OpenSearch连接错误等）
+            logger.error(f"Error processing file {pdf_path}: {e}")
+            # 这里的错误处理取决于需求，是否重试、记录失败日志等
+            return False
 
     def stop_scanning(self):
-        """设置标志以停止正在进行的扫描"""
-        self._stop_scanning = True
+        """设置标志以停止正在进行的扫描，正在提取的文件会在当前页结束后中断"""
+        self._stop_event.set()
         logger.info("Stop scanning requested.")
 
-    
\ No newline at end of file
+    def reset_stop(self):
+        """清除停止标志，使同一个扫描器可以再次启动"""
+        self._stop_event.clear()
+
+    def is_stopping(self):
+        return self._stop_event.is_set()
+
+    def wait(self, seconds):
+        """可被 stop_scanning 打断的等待，返回 True 表示收到了停止请求"""
+        return self._stop_event.wait(seconds)
+
+
+def _timed_walk(directory_path):
+    """os.walk 的包装，记录每次读取目录的耗时"""
+    walker = os.walk(directory_path)
+    while True:
+        with STAGE_SECONDS.time(stage='walk'):
+            entry = next(walker, None)
+        if entry is None:
+            return
+        yield entry
+
+
+def _relative_parts(directory_path, root):
+    """root 相对扫描根目录的路径分量元组，根目录本身为 ()"""
+    rel = os.path.relpath(root, directory_path)
+    return () if rel == os.curdir else tuple(rel.split(os.sep))
+
+
+def _subtree_done(parts, position):
+    """在排序的前序遍历中，parts 对应的整棵子树是否都在断点位置之前"""
+    return parts < position and position[:len(parts)] != parts
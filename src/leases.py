@@ -0,0 +1,182 @@
+import abc
+import logging
+import socket
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseStore(abc.ABC):
+    """
+    文件租约存储的接口，多个索引节点通过它分配同一目录树中的文件。
+
+    节点处理文件前先 claim，持有期间定期 heartbeat 续约，处理完成后 release；
+    节点宕机后租约过期，其他节点可以接手。
+    """
+    @abc.abstractmethod
+    def claim(self, file_path, node_id, ttl):
+        """尝试获得文件的租约（没有租约、租约已过期或本节点已持有时成功），返回是否成功"""
+
+    @abc.abstractmethod
+    def heartbeat(self, node_id, ttl):
+        """为本节点持有的全部租约续约，返回续约的数量"""
+
+    @abc.abstractmethod
+    def release(self, file_path, node_id):
+        """释放本节点持有的租约"""
+
+    @abc.abstractmethod
+    def release_all(self, node_id):
+        """释放本节点持有的全部租约"""
+
+
+class SQLiteLeaseStore(LeaseStore):
+    """
+    保存在 SQLite 中的租约，默认与已索引文件记录使用同一个数据库。
+
+    多台机器共用时，数据库所在的共享存储必须支持文件锁（SQLite 依赖文件锁保证 claim 的原子性）。
+    """
+    def __init__(self, db_path="indexed_files.db"):
+        self.db_path = db_path
+        self._create_table()
+
+    def _get_connection(self):
+        """获取数据库连接（自动提交模式，事务由 BEGIN IMMEDIATE 显式控制）"""
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+
+    def _create_table(self):
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS file_leases (
+                    file_path TEXT PRIMARY KEY,
+                    node_id TEXT NOT NULL, -- 持有租约的节点
+                    expires_at REAL NOT NULL, -- 租约过期时间戳
+                    claimed_at REAL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_file_leases_node ON file_leases (node_id)")
+        except sqlite3.Error as e:
+            logger.error(f"Error creating lease table: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def claim(self, file_path, node_id, ttl):
+        conn = None
+        try:
+            conn = self._get_connection()
+            now = time.time()
+            # BEGIN IMMEDIATE 立即取得写锁，多个节点同时 claim 同一文件时只有一个成功
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT node_id, expires_at FROM file_leases WHERE file_path = ?", (file_path,)).fetchone()
+            if row and row[0] != node_id and row[1] > now:
+                conn.execute("ROLLBACK")
+                return False
+            if row and row[0] != node_id:
+                logger.info(f"Taking over expired lease on {file_path} from node {row[0]}")
+            conn.execute(
+                "INSERT OR REPLACE INTO file_leases (file_path, node_id, expires_at, claimed_at) VALUES (?, ?, ?, ?)",
+                (file_path, node_id, now + ttl, now))
+            conn.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error claiming lease on {file_path}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def heartbeat(self, node_id, ttl):
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.execute("UPDATE file_leases SET expires_at = ? WHERE node_id = ?", (time.time() + ttl, node_id))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error renewing leases for node {node_id}: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def release(self, file_path, node_id):
+        self._execute("DELETE FROM file_leases WHERE file_path = ? AND node_id = ?", (file_path, node_id))
+
+    def release_all(self, node_id):
+        self._execute("DELETE FROM file_leases WHERE node_id = ?", (node_id,))
+
+    def _execute(self, sql, params):
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Error releasing lease: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+
+class LeaseManager:
+    """
+    本节点的租约管理：claim/release 单个文件，扫描期间由后台线程每隔 lease_seconds/3 续约一次。
+    """
+    def __init__(self, store, node_id=None, lease_seconds=60):
+        self.store = store
+        # 默认使用主机名，重启后节点 ID 不变，断点续扫仍能找到本节点的扫描会话
+        self.node_id = node_id or socket.gethostname()
+        self.lease_seconds = lease_seconds
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._users = 0
+        self._thread = None
+
+    def claim(self, file_path):
+        return self.store.claim(file_path, self.node_id, self.lease_seconds)
+
+    def release(self, file_path):
+        self.store.release(file_path, self.node_id)
+
+    def start(self):
+        """启动续约线程；多个根目录同时扫描时共用一个线程，按引用计数管理"""
+        with self._lock:
+            self._users += 1
+            if self._thread:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """最后一个扫描结束时停止续约并释放本节点剩余的租约，被中断的文件可以立即由其他节点接手"""
+        with self._lock:
+            self._users -= 1
+            if self._users > 0 or not self._thread:
+                return
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+            self.store.release_all(self.node_id)
+
+    def _run(self):
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            self.store.heartbeat(self.node_id, self.lease_seconds)
+
+
+def create_lease_manager(config):
+    """根据配置中的 cluster 节创建 LeaseManager，未启用多节点时返回 None"""
+    cluster_config = config.get('cluster', {})
+    if not cluster_config.get('enabled', False):
+        return None
+    backend = cluster_config.get('backend', 'sqlite')
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown lease backend: {backend}")
+    db_path = cluster_config.get('db_path') or config.get('database', {}).get('db_path', 'indexed_files.db')
+    manager = LeaseManager(SQLiteLeaseStore(db_path), cluster_config.get('node_id'),
+                           cluster_config.get('lease_seconds', 60))
+    logger.info(f"Distributed indexing enabled as node {manager.node_id} (lease {manager.lease_seconds}s, {db_path})")
+    return manager
@@ -2,31 +2,43 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import time
 import datetime
 import os
 import logging
 from logging.handlers import RotatingFileHandler # 用于日志文件输出
 from sys_config import SysConfig
+from progress import RollingRate, format_eta
 import queue
 # 导入您之前编写的模块
 try:
     from opensearch_client import OSClient
+    from search_client import create_search_client
     from db_manager import IndexedFileManager
     from pdf_processor import PDFProcessor # 假设 PDFProcessor 包含了提取和索引逻辑
-    from file_scanner import FileScanner
+    from scheduler import build_scheduler, load_roots
+    from metrics import start_metrics
 except ImportError as e:
     messagebox.showerror("导入错误", f"无法导入必要的模块：{e}\n请确保 opensearch_client.py, db_manager.py, pdf_processor.py, file_scanner.py 都在同一个目录下。")
     exit() # 如果导入失败，退出程序
 
 
+# 启动新扫描时等待上一次扫描线程退出的最长时间（秒）
+SCAN_STOP_TIMEOUT = 2
+# 搜索框防抖时间（毫秒）
+SEARCH_DEBOUNCE_MS = 250
+# 线程间消息队列的容量
+MESSAGE_QUEUE_MAXSIZE = 10000
+# check_queue 每次最多处理的消息数
+MAX_MESSAGES_PER_TICK = 500
+# 队列积压超过该值时只显示警告和错误日志
+LOG_FLOOD_THRESHOLD = 2000
 
 # --- GUI 类 ---
 class PDFIndexerApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("PDF 到 OpenSearch 索引工具")
-        self.geometry("600x400")
+        self.geometry("760x650")
         self.style = ttk.Style(self)
         self.setup_style()
 
@@ -41,9 +53,22 @@ class PDFIndexerApp(tk.Tk):
         # 确保初始化相关的变量
         self.os_client = None
         self.db_manager = None
-        self.pdf_processor = None
-        self.file_scanner = None
-        self.message_queue = queue.Queue()  # 用于线程间通信的队列
+        self.scheduler = None # 各根目录的 FileScanner 由 RootScheduler 统一调度
+        # 用于线程间通信的有界队列，日志过多时丢弃而不是无限占用内存
+        self.message_queue = queue.Queue(maxsize=MESSAGE_QUEUE_MAXSIZE)
+        self.gui_log_handler = None
+
+        # 搜索框相关状态：防抖定时器、查询序号（用于丢弃过期结果）、查询用的检索客户端
+        self._search_after_id = None
+        self._search_seq = 0
+        self._search_client = None
+        self._search_client_lock = threading.Lock()
+
+        # 进度面板使用的滚动速率
+        self._file_rate = RollingRate()
+        self._page_rate = RollingRate()
+        self._byte_rate = RollingRate()
+        self._progress_after_id = None
 
         self.create_widgets()
 
@@ -58,11 +83,13 @@ class PDFIndexerApp(tk.Tk):
 
         # 启动队列检查
         self.check_queue()
+        self.update_progress_panel()
 
     def setup_logging(self):
         """配置日志系统，将输出重定向到 GUI、控制台和文件"""
         tk_handler = GUILogHandler(self)
         tk_handler.setLevel(logging.INFO)
+        self.gui_log_handler = tk_handler
 
         # 控制台的log
         console_handler = logging.StreamHandler()
@@ -90,24 +117,50 @@ class PDFIndexerApp(tk.Tk):
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Logging to file: {os.path.abspath(log_filename)}")
     def check_queue(self):
-        """多线程间发送GUIlog 定期检查队列并更新GUI"""
+        """
+        多线程间发送GUIlog 定期检查队列并更新GUI。
+
+        每次最多处理 MAX_MESSAGES_PER_TICK 条消息，所有日志合并为一次插入；
+        队列积压超过 LOG_FLOOD_THRESHOLD 时丢弃 INFO 日志，只保留警告和错误，并输出一行汇总。
+        """
+        flooding = self.message_queue.qsize() > LOG_FLOOD_THRESHOLD
+        log_entries = []
+        suppressed = 0
         try:
-            while True:
+            for _ in range(MAX_MESSAGES_PER_TICK):
                 message = self.message_queue.get_nowait()
-                self.append_log(f"[Thread Msg] {message}")
+                kind = message[0]
+                if kind == 'log':
+                    _, text, levelno = message
+                    if flooding and levelno < logging.WARNING:
+                        suppressed += 1
+                        continue
+                    log_entries.append((text, 'error' if levelno >= logging.ERROR else 'normal'))
+                elif kind in ('suggest', 'search'):
+                    self.show_search_results(*message)
+                else:
+                    log_entries.append((f"[Thread Msg] {message}", 'normal'))
         except queue.Empty:
             pass
+
+        dropped = self.gui_log_handler.take_dropped() if self.gui_log_handler else 0
+        if suppressed or dropped:
+            log_entries.append((f"... 日志过多：跳过 {suppressed} 条 INFO 日志，队列满丢弃 {dropped} 条（完整日志见日志文件）", 'warning'))
+        if log_entries:
+            self.append_logs(log_entries)
         # 保存 after ID，以便在退出时取消
         self._check_queue_after_id = self.after(200, self.check_queue)
-    def append_log(self, message, max_lines=500):
-        """将日志消息追加到日志文本框，并限制最大行数"""
+
+    def append_logs(self, entries, max_lines=500):
+        """将一批 (消息, 标签) 一次性追加到日志文本框，并限制最大行数"""
+        # 只有最后 max_lines 条会留在文本框中，前面的无需插入
+        entries = entries[-max_lines:]
+        chunks = []
+        for message, tag in entries:
+            chunks.extend((message + '\n', tag))
         try:
             self.log_text.config(state='normal')
-            tag = 'normal'
-            if '[ERROR]' in message:
-                tag = 'error'
-                self.log_text.tag_configure('error', foreground='red')
-            self.log_text.insert(tk.END, message + '\n', tag)
+            self.log_text.insert(tk.END, *chunks)
             self.log_text.see(tk.END)
 
             # 使用行计数器代替 splitlines
@@ -118,8 +171,7 @@ class PDFIndexerApp(tk.Tk):
             self.log_text.config(state='disabled')
         except tk.TclError:
             pass
-    
-        
+
     def setup_style(self):
         """设置 ttk 样式"""
         self.style.theme_use('clam') # 或 'alt', 'default', 'classic'
@@ -150,6 +202,28 @@ class PDFIndexerApp(tk.Tk):
         self.start_stop_button = ttk.Button(control_frame, text="启动扫描", command=self.toggle_scan)
         self.start_stop_button.pack(side=tk.LEFT, expand=True) # 扩展按钮宽度
 
+        # 进度面板 Frame：吞吐量、待处理数量、预计完成时间、正在处理的文件
+        progress_frame = ttk.Frame(self, padding="10")
+        progress_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.progress_text = tk.StringVar(value="空闲")
+        self.in_flight_text = tk.StringVar(value="")
+        ttk.Label(progress_frame, textvariable=self.progress_text).pack(side=tk.TOP, anchor=tk.W)
+        ttk.Label(progress_frame, textvariable=self.in_flight_text).pack(side=tk.TOP, anchor=tk.W)
+
+        # 搜索 Frame：输入时按住院号/文件名称前缀联想，回车进行全文检索
+        search_frame = ttk.Frame(self, padding="10")
+        search_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        ttk.Label(search_frame, text="搜索:").pack(side=tk.TOP, anchor=tk.W)
+        self.search_text = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_text)
+        self.search_entry.pack(side=tk.TOP, fill=tk.X)
+        self.search_entry.bind('<KeyRelease>', self.on_search_key)
+        self.search_entry.bind('<Return>', self.on_search_enter)
+
+        self.search_results = tk.Listbox(search_frame, height=6)
+        self.search_results.pack(side=tk.TOP, fill=tk.X, pady=(5, 0))
+
         # 状态/日志显示 Frame
         log_frame = ttk.Frame(self, padding="10")
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -158,6 +232,8 @@ class PDFIndexerApp(tk.Tk):
 
         # Text 控件用于显示日志，并添加滚动条
         self.log_text = tk.Text(log_frame, wrap=tk.WORD, state='disabled', height=10) # wrap=tk.WORD 按单词换行, state='disabled' 禁止编辑
+        self.log_text.tag_configure('error', foreground='red')
+        self.log_text.tag_configure('warning', foreground='orange')
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # 添加滚动条
@@ -166,6 +242,95 @@ class PDFIndexerApp(tk.Tk):
         self.log_text['yscrollcommand'] = log_scrollbar.set
 
 
+    def on_search_key(self, event):
+        """输入变化时防抖：停止输入 SEARCH_DEBOUNCE_MS 毫秒后才发起前缀联想"""
+        if event.keysym == 'Return':
+            return
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_search, 'suggest')
+
+    def on_search_enter(self, event):
+        """回车立即执行全文检索"""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._run_search('search')
+
+    def _run_search(self, kind):
+        """在后台线程执行查询，结果通过 message_queue 送回 Tk 线程"""
+        self._search_after_id = None
+        text = self.search_text.get().strip()
+        self._search_seq += 1
+        if not text:
+            self.search_results.delete(0, tk.END)
+            return
+        threading.Thread(target=self._search_worker, args=(kind, self._search_seq, text), daemon=True).start()
+
+    def _search_worker(self, kind, seq, text):
+        """后台线程：执行联想或检索"""
+        try:
+            client = self._get_search_client()
+            if kind == 'suggest':
+                results = client.suggest(text)
+            else:
+                results = client.search(text)
+        except Exception as e:
+            self.logger.error(f"Search failed for {text!r}: {e}")
+            results = []
+        self.message_queue.put((kind, seq, results))
+
+    def _get_search_client(self):
+        """获取查询用的检索客户端，首次使用时创建（可能较慢，因此只在后台线程调用）"""
+        with self._search_client_lock:
+            if self._search_client is None:
+                self._search_client = create_search_client(self.config)
+            return self._search_client
+
+    def show_search_results(self, kind, seq, results):
+        """在 Tk 线程中显示查询结果，忽略已被更新输入取代的过期结果"""
+        if seq != self._search_seq:
+            return
+        self.search_results.delete(0, tk.END)
+        for result in results:
+            if kind == 'suggest':
+                line = f"{result['住院号']}  {result['文件名称']}"
+            else:
+                snippet = result['content_snippet'].replace('<mark>', '[').replace('</mark>', ']').replace('\n', ' ')
+                line = f"{result['文件名称']} 第{result['页号']}页: {snippet}"
+            self.search_results.insert(tk.END, line)
+        if not results:
+            self.search_results.insert(tk.END, "（无结果）")
+
+    def update_progress_panel(self):
+        """每秒读取一次扫描进度快照，计算滚动速率和预计完成时间"""
+        if self.scheduler:
+            snap = self.scheduler.progress.snapshot()
+            self._file_rate.add(snap['done'])
+            self._page_rate.add(snap['pages'])
+            self._byte_rate.add(snap['bytes'])
+            files_per_sec = self._file_rate.rate()
+            bytes_per_sec = self._byte_rate.rate()
+
+            # 按剩余字节数估计，文件大小差异大时比按文件数更准确
+            remaining_bytes = max(snap['discovered_bytes'] - snap['bytes'], 0)
+            eta = None
+            if snap['state'] == 'indexing' and bytes_per_sec > 0:
+                eta = remaining_bytes / bytes_per_sec
+            elif snap['state'] == 'indexing' and files_per_sec > 0:
+                eta = snap['pending'] / files_per_sec
+
+            state = {'idle': '空闲', 'discovering': '遍历并索引', 'indexing': '索引中'}.get(snap['state'], snap['state'])
+            self.progress_text.set(
+                f"{state} | 已遍历 {snap['seen']} | 待处理 {snap['pending']}/{snap['discovered']} | "
+                f"完成 {snap['indexed']} 错误 {snap['errors']} 跳过 {snap['skipped']} | "
+                f"{files_per_sec:.1f} 文件/s {self._page_rate.rate():.1f} 页/s | 预计剩余 {format_eta(eta)}"
+            )
+            in_flight = snap['in_flight']
+            self.in_flight_text.set(
+                "正在处理: " + ", ".join(os.path.basename(path) for path in in_flight[:3]) if in_flight else ""
+            )
+        self._progress_after_id = self.after(1000, self.update_progress_panel)
+
     def browse_directory(self):
         """打开目录选择对话框"""
         directory = filedialog.askdirectory(initialdir=self.pdf_directory.get() or ".") # 使用当前值或 '.' 作为初始目录
@@ -186,7 +351,9 @@ class PDFIndexerApp(tk.Tk):
     def start_scan(self):
         """启动后台扫描线程"""
         pdf_dir = self.pdf_directory.get()
-        if not os.path.isdir(pdf_dir):
+        # 配置了 app_settings.roots 时按配置扫描全部根目录，否则扫描界面中选择的目录
+        configured_roots = self.config['app_settings'].get('roots')
+        if not configured_roots and not os.path.isdir(pdf_dir):
             messagebox.showwarning("无效目录", "请选择一个有效的 PDF 存放目录。")
             self.logger.warning("Attempted to start scan with invalid directory.")
             return
@@ -195,6 +362,13 @@ class PDFIndexerApp(tk.Tk):
             self.logger.info("Scanning is already running.")
             return
 
+        # 上一次停止的扫描线程在当前页处理完后就会退出，这里稍等它结束，避免两个线程同时扫描
+        if self.scanning_thread and self.scanning_thread.is_alive():
+            self.scanning_thread.join(timeout=SCAN_STOP_TIMEOUT)
+            if self.scanning_thread.is_alive():
+                messagebox.showinfo("请稍候", "上一次扫描仍在停止中，请稍后再启动。")
+                return
+
         self.logger.info(f"Starting scan thread for directory: {pdf_dir}")
         self._is_scanning = True
         self.start_stop_button.config(text="停止扫描", state=tk.NORMAL) # 允许点击停止
@@ -214,21 +388,24 @@ class PDFIndexerApp(tk.Tk):
             # 简单起见，我们假设 OSClient 能从 config.json 找到配置，或者您修改其 __init__
             # 这里假设 OSClient 构造函数读取 config.json 中的 opensearch 部分
             # 或者您可以直接传递配置字典
-            opensearch_config = self.config.get('opensearch', {})
             db_config = self.config.get('database', {})
 
             # 在这里初始化，确保它们能被线程访问
-            self.os_client = OSClient(opensearch_config) # 或者传递配置字典
+            # 根据 app_settings.search_backend 选择 OpenSearch 或本地 SQLite FTS5 后端
+            self.os_client = create_search_client(self.config)
+            self.os_client.create_index()
             self.db_manager = IndexedFileManager(db_path=db_config.get('db_path', 'indexed_files.db'))
 
-            # PDFProcessor 需要 OSClient 实例
-            self.pdf_processor = PDFProcessor(self.os_client)
+            # 每个根目录一个 FileScanner，共用 PDFProcessor（bulk 写入）和提取线程名额
+            roots = load_roots(self.config, None if configured_roots else pdf_dir)
+            self.scheduler = build_scheduler(self.config, roots, self.os_client, self.db_manager)
 
-            # FileScanner 需要 DBManager 和 PDFProcessor 实例
-            self.file_scanner = FileScanner(self.db_manager, self.pdf_processor)
+            # 按配置启动本地指标端点和快照输出（进程内只启动一次）
+            start_metrics(self.config)
 
             # 启动扫描线程
-            self.scanning_thread = threading.Thread(target=self._run_scan_loop, args=(pdf_dir,))
+            # 调度器作为参数传入，线程只使用属于自己的调度器，不会误用下一次启动创建的新实例
+            self.scanning_thread = threading.Thread(target=self._run_scan_loop, args=(self.scheduler,))
             self.scanning_thread.daemon = True # 设置为守护线程，主程序退出时自动退出
             self.scanning_thread.start()
 
@@ -244,8 +421,8 @@ class PDFIndexerApp(tk.Tk):
 
         self.logger.info("Stopping scan thread...")
         self._is_scanning = False # 设置标志
-        if self.file_scanner:
-             self.file_scanner.stop_scanning() # 调用 FileScanner 的停止方法
+        if self.scheduler:
+            self.scheduler.stop() # 停止所有根目录的扫描和等待
 
         # GUI 状态更新
         self.start_stop_button.config(text="启动扫描")
@@ -254,35 +431,12 @@ class PDFIndexerApp(tk.Tk):
         # 可以选择在这里等待线程结束，但这会阻塞 GUI
         # 如果设置为 daemon 线程，通常不需要显式join，退出主程序线程即可
 
-    def _run_scan_loop(self, directory_path):
+    def _run_scan_loop(self, scheduler):
         """后台线程中运行的扫描循环"""
-        self.logger.info(f"Scan loop thread started for directory: {directory_path}")
-        while self._is_scanning:
-            try:
-                # 在每次扫描开始前检查停止标志
-                if not self._is_scanning:
-                    break
-
-                # --- 调用文件扫描和索引的主逻辑 ---
-                # 这个方法在 file_scanner.py 中实现
-                # 它会遍历目录，检查数据库，调用 pdf_processor 进行提取和索引
-                if self.file_scanner:
-                    self.file_scanner.scan_and_index_directory(directory_path)
-                else:
-                    self.logger.error("FileScanner is not initialized in the scanning thread.")
-                    break # 无法扫描，退出循环
-
-
-            except Exception as e:
-                self.logger.error(f"Error during scan loop iteration: {e}")
-                # 在发生错误时暂停一段时间，避免无限循环错误
-                time.sleep(60) # 例如，错误后暂停 60 秒再尝试下一次循环
-
-            # 在每次扫描周期结束后暂停
-            if self._is_scanning: # 再次检查标志，确保在扫描完成后到暂停期间用户没有点击停止
-                self.logger.info(f"Scan loop finished one cycle. Waiting {self.scan_interval} seconds for next scan.")
-                time.sleep(self.scan_interval)
-
+        self.logger.info(f"Scan loop thread started for: {', '.join(root['path'] for root in scheduler.roots)}")
+        # 每个根目录按各自的 interval_seconds（或 watch 模式）扫描；
+        # 停止扫描时正在进行的扫描和等待都会立即结束，未完成的扫描已写入断点，下次启动时继续
+        scheduler.run()
         self.logger.info("Scan loop thread finished.")
 
 
@@ -299,13 +453,17 @@ class PDFIndexerApp(tk.Tk):
                 except tk.TclError:
                     self.logger.warning("Failed to cancel check_queue after scheduling, possibly already destroyed.")
                 self._check_queue_after_id = None
+            if self._progress_after_id is not None:
+                try:
+                    self.after_cancel(self._progress_after_id)
+                except tk.TclError:
+                    pass
+                self._progress_after_id = None
 
             self.stop_scan() # 尝试停止扫描线程
-            # 在这里可以添加清理代码，如关闭数据库连接等
-            # 对于 daemon 线程，通常不需要显式清理，它们会随主线程退出
-            # 但如果是非 daemon 线程或需要确保资源释放，可以在这里等待线程结束
-            # if self.scanning_thread and self.scanning_thread.is_alive():
-            #     self.scanning_thread.join(timeout=5) # 等待线程最多5秒
+            # 等待扫描线程在当前页结束后退出，确保断点和索引记录已写入
+            if self.scanning_thread and self.scanning_thread.is_alive():
+                self.scanning_thread.join(timeout=5) # 等待线程最多5秒
 
             SysConfig.save_config(self.config) # 确保在退出时保存最新的目录设置
             self.destroy() # 销毁窗口
@@ -318,6 +476,7 @@ class GUILogHandler(logging.Handler):
     def __init__(self, app):
         super().__init__()
         self.app = app  # SimpleThreadTestApp 实例
+        self.dropped = 0  # 队列满时丢弃的日志条数
         # 设置日志格式
         self.setFormatter(logging.Formatter(
             '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
@@ -328,10 +487,19 @@ class GUILogHandler(logging.Handler):
         """处理日志记录，将格式化的消息放入队列"""
         try:
             msg = self.format(record)  # 格式化日志消息
-            self.app.message_queue.put(('log', msg))  # 放入队列，标记为日志消息
+            # 放入队列，标记为日志消息；不阻塞产生日志的工作线程，队列满时只计数
+            self.app.message_queue.put_nowait(('log', msg, record.levelno))
+        except queue.Full:
+            self.dropped += 1  # emit 在 Handler 的锁内调用
         except Exception:
             self.handleError(record)
 
+    def take_dropped(self):
+        """返回并清零丢弃的日志条数（在 Tk 线程调用）"""
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
 
 
 # --- 主程序入口 ---
@@ -347,7 +515,7 @@ if __name__ == "__main__":
 ###################################################################
 
 def TestOpenSearch():
-    config = SysConfig.load_config().get("opeansearch")
+    config = SysConfig.load_config().get("opensearch")
     #连接opensearch
     os_client = OSClient(config)
     #创建索引
@@ -356,7 +524,7 @@ def TestOpenSearch():
     # 配置
     PDF_DIRECTORY = './pdf_files'  # 替换为你的PDF文件目录
     # 索引目录中的所有PDF文件，把PDF内容提取出来，并保存到OpenSearch中
-    pdf_processor = PDFProcessor(os)
+    pdf_processor = PDFProcessor(os_client)
     pdf_processor.index_directory(PDF_DIRECTORY)
 
     # 如果需要搜索，这里可以调用 os_client.search()
@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 延迟（秒）、文件大小（字节）、页数的直方图桶
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+BYTES_BUCKETS = (10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000)
+PAGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+LAG_BUCKETS = (1, 10, 60, 300, 900, 3600, 4 * 3600, 24 * 3600, 7 * 24 * 3600)
+
+
+class _Metric:
+    """指标基类：按标签值分组保存数据，所有更新在锁内完成"""
+    type_name = ''
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            return [(f"{self.name}{self._label_str(key)}", value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return {','.join(key): value for key, value in self._values.items()}
+
+
+class Gauge(_Metric):
+    """可以任意设置的瞬时值"""
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    collect = Counter.collect
+    snapshot = Counter.snapshot
+
+
+class Histogram(_Metric):
+    """累积桶直方图，输出格式与 Prometheus 客户端一致"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data['counts'][i] += 1
+                    break
+            data['sum'] += value
+            data['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文管理器，退出时记录耗时（秒），异常时也记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        samples = []
+        with self._lock:
+            for key, data in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, data['counts']):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket{self._label_str(key, ('le', bound))}", cumulative))
+                samples.append((f"{self.name}_bucket{self._label_str(key, ('le', '+Inf'))}", data['count']))
+                samples.append((f"{self.name}_sum{self._label_str(key)}", data['sum']))
+                samples.append((f"{self.name}_count{self._label_str(key)}", data['count']))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                ','.join(key): {'count': data['count'], 'sum': data['sum'],
+                                'avg': data['sum'] / data['count'] if data['count'] else 0.0}
+                for key, data in self._values.items()
+            }
+
+
+class Registry:
+    """指标注册表"""
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render_prometheus(self):
+        """按 Prometheus 文本格式输出所有指标"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, value in metric.collect():
+                lines.append(f"{sample_name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """所有指标的 JSON 友好快照"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {'timestamp': time.time(), 'metrics': {metric.name: metric.snapshot() for metric in metrics}}
+
+
+REGISTRY = Registry()
+
+# --- 索引流程各阶段的指标 ---
+STAGE_SECONDS = Histogram(
+    'pdf_indexer_stage_seconds', 'Latency of each indexing stage (walk, stat, is_indexed, extract, bulk, mark_indexed)',
+    labelnames=('stage',))
+STAGE_ERRORS = Counter('pdf_indexer_stage_errors_total', 'Errors raised in each indexing stage', labelnames=('stage',))
+FILE_BYTES = Histogram('pdf_indexer_file_bytes', 'Size of PDF files that were extracted', buckets=BYTES_BUCKETS)
+FILE_PAGES = Histogram('pdf_indexer_file_pages', 'Pages with text per extracted PDF', buckets=PAGES_BUCKETS)
+FILES_TOTAL = Counter('pdf_indexer_files_total', 'Files handled by the scanner', labelnames=('result',))
+INDEX_LAG_SECONDS = Histogram(
+    'pdf_indexer_index_lag_seconds', 'Time from file modification to the file being indexed', buckets=LAG_BUCKETS)
+PENDING_FILES = Gauge('pdf_indexer_pending_files', 'Files discovered in the current scan that are not processed yet', ('root',))
+LAST_SCAN_COMPLETED = Gauge(
+    'pdf_indexer_last_scan_completed_timestamp_seconds', 'Unix time at which the last full scan finished', ('root',))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求很频繁，不写入应用日志
+        pass
+
+
+class MetricsServer:
+    """在后台线程提供 /metrics（Prometheus 文本格式）和 /metrics.json"""
+    def __init__(self, host='127.0.0.1', port=9464):
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        host, port = self.httpd.server_address[:2]
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SnapshotWriter:
+    """定期把指标快照写入 JSON 文件（先写临时文件再替换，读取方不会看到半个文件）"""
+    def __init__(self, path, interval=60, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        logger.info(f"Writing metrics snapshots to {self.path} every {self.interval} seconds")
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def write(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.registry.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+        self.write()
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_metrics(config):
+    """
+    根据配置中的 metrics 节启动指标端点和快照输出，同一进程只启动一次。
+
+    Args:
+        config (dict): SysConfig.load_config() 返回的完整配置。
+    """
+    global _started
+    metrics_config = config.get('metrics', {})
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        if metrics_config.get('http_enabled'):
+            try:
+                MetricsServer(metrics_config.get('host', '127.0.0.1'), metrics_config.get('port', 9464)).start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint: {e}")
+        if metrics_config.get('snapshot_path'):
+            SnapshotWriter(metrics_config['snapshot_path'], metrics_config.get('snapshot_interval_seconds', 60)).start()
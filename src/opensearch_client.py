@@ -2,16 +2,65 @@ import logging
 import json
 
 # 将 elasticsearch 导入改为 opensearchpy
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, helpers
 # 导入 OpenSearch 的异常类，并根据需要改名以区分
 from opensearchpy.exceptions import ConnectionError as OSConnectionError, RequestError
 from sys_config import SysConfig
+from search_model import file_key
 
 # ... 其他导入和日志设置
 # 设置日志
 #logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 前缀联想支持的最大前缀长度（edge n-gram 的 max_gram）
+PREFIX_MAX_LENGTH = 32
+# bulk 请求被拒绝（429）时的重试次数、首次退避秒数和单次退避上限。
+# 重试期间的等待不响应停止请求，总等待控制在 1 + 2 + 2 = 5 秒以内；
+# 持续被拒绝时由 AdaptiveController 降低并发，而不是靠长时间退避
+BULK_MAX_RETRIES = 3
+BULK_INITIAL_BACKOFF = 1
+BULK_MAX_BACKOFF = 2
+
+def build_search_body(query, size=10):
+    """构造全文检索的查询体，同步和异步客户端共用"""
+    return {
+        'query': {
+            'match': {
+                '页内容': query
+            }
+        },
+        'highlight': {
+            'fields': {
+                '页内容': {
+                    'pre_tags': ['<mark>'],
+                    'post_tags': ['</mark>'],
+                    'fragment_size': 200,
+                    'number_of_fragments': 1
+                }
+            }
+        },
+        '_source': ['文件名称', '页号', '页内容'],  # 仅返回必要字段
+        'size': size
+    }
+
+
+def parse_search_response(response):
+    """把 OpenSearch 的检索响应转换为页面信息列表"""
+    results = []
+    for hit in response['hits']['hits']:
+        # 注意：highlight 结果的结构在不同版本库中可能略有差异，
+        # 但 opensearch-py 大部分与 elasticsearch-py 兼容
+        highlight = hit.get('highlight', {}).get('页内容', [''])[0]
+        results.append({
+            '文件名称': hit['_source']['文件名称'],
+            '页号': hit['_source']['页号'],
+            '页内容': hit['_source']['页内容'],
+            'score': hit['_score'],
+            'content_snippet': highlight or ''
+        })
+    return results
+
 
 # 将类名从 ESClient 改为 OSClient
 class OSClient:
@@ -55,16 +104,46 @@ class OSClient:
     # 将函数名注释改为 OpenSearch 相关
     def create_index(self):
         """创建OpenSearch索引（如果不存在）"""
+        # 住院号/文件名称 增加 .prefix 子字段：索引时生成 edge n-gram，
+        # 前缀查询变成一次词项查找，不再需要扫描 keyword 词典的 wildcard 查询
+        prefix_field = {
+            'prefix': {
+                'type': 'text',
+                'analyzer': 'prefix_index',
+                'search_analyzer': 'prefix_search'
+            }
+        }
         mapping = {
+            'settings': {
+                'analysis': {
+                    'filter': {
+                        'prefix_edge_ngram': {'type': 'edge_ngram', 'min_gram': 1, 'max_gram': PREFIX_MAX_LENGTH},
+                        'prefix_truncate': {'type': 'truncate', 'length': PREFIX_MAX_LENGTH}
+                    },
+                    'analyzer': {
+                        'prefix_index': {
+                            'type': 'custom',
+                            'tokenizer': 'keyword',
+                            'filter': ['lowercase', 'prefix_edge_ngram']
+                        },
+                        'prefix_search': {
+                            'type': 'custom',
+                            'tokenizer': 'keyword',
+                            'filter': ['lowercase', 'prefix_truncate']
+                        }
+                    }
+                }
+            },
             'mappings': {
                 'properties': {
                     '患者名': {'type': 'keyword'}, # 使用 keyword 类型以便精确匹配
-                    '住院号': {'type': 'keyword'}, # 使用 keyword 类型以便精确匹配
+                    '住院号': {'type': 'keyword', 'fields': prefix_field}, # 使用 keyword 类型以便精确匹配
                     '住院日期': {'type': 'date'},
                     '出院日期': {'type': 'date'},
                     '文件类型': {'type': 'keyword'},
                     '文件目录': {'type': 'keyword'},
-                    '文件名称': {'type': 'keyword'}, # 使用 keyword 类型以便精确匹配
+                    '文件名称': {'type': 'keyword', 'fields': prefix_field}, # 使用 keyword 类型以便精确匹配
+                    '文件标识': {'type': 'keyword'}, # 文件完整路径的哈希，按文件删除页面文档
                     '页号': {'type': 'long'},
                     '页内容': {
                         'type': 'text',
@@ -81,6 +160,7 @@ class OSClient:
                 logger.info(f"Created index: {self.index_name}")
             else:
                 logger.info(f"Index {self.index_name} already exists")
+                logger.info("Prefix suggestions need the 住院号.prefix/文件名称.prefix fields; rebuild indexes created before they were added.")
         except RequestError as e: # RequestError 在 opensearch-py 中名称相同
             logger.error(f"Error creating index: {e}")
             raise
@@ -88,46 +168,92 @@ class OSClient:
     # 将函数名注释改为 OpenSearch 相关
     def search(self, query, size=10):
         """搜索OpenSearch中的内容，返回页面信息"""
-        search_body = {
+        try:
+            # 使用新的客户端变量进行搜索
+            response = self.os.search(index=self.index_name, body=build_search_body(query, size))
+            return parse_search_response(response)
+        except Exception as e:
+            # 修改日志信息
+            logger.error(f"Search error: {e}")
+            return []
+
+    def suggest(self, prefix, size=10):
+        """按住院号或文件名称前缀联想，返回去重后的文件列表 [{'住院号', '文件名称'}]"""
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        suggest_body = {
             'query': {
-                'match': {
-                    '页内容': query
-                }
-            },
-            'highlight': {
-                'fields': {
-                    '页内容': {
-                        'pre_tags': ['<mark>'],
-                        'post_tags': ['</mark>'],
-                        'fragment_size': 200,
-                        'number_of_fragments': 1
-                    }
+                'bool': {
+                    'should': [
+                        {'match': {'住院号.prefix': prefix}},
+                        {'match': {'文件名称.prefix': prefix}}
+                    ],
+                    'minimum_should_match': 1
                 }
             },
-            '_source': ['文件名称', '页号', '页内容'],  # 仅返回必要字段
+            'collapse': {'field': '文件名称'}, # 每个文件只返回一页
+            '_source': ['住院号', '文件名称'],
             'size': size
         }
         try:
-            # 使用新的客户端变量进行搜索
-            response = self.os.search(index=self.index_name, body=search_body)
-            results = []
-            for hit in response['hits']['hits']:
-                # 注意：highlight 结果的结构在不同版本库中可能略有差异，
-                # 但 opensearch-py 大部分与 elasticsearch-py 兼容
-                highlight = hit.get('highlight', {}).get('页内容', [''])[0]
-                results.append({
-                    '文件名称': hit['_source']['文件名称'],
-                    '页号': hit['_source']['页号'],
-                    '页内容': hit['_source']['页内容'],
-                    'score': hit['_score'],
-                    'content_snippet': highlight or ''
-                })
-            return results
+            response = self.os.search(index=self.index_name, body=suggest_body)
+            return [
+                {'住院号': hit['_source'].get('住院号', ''), '文件名称': hit['_source'].get('文件名称', '')}
+                for hit in response['hits']['hits']
+            ]
         except Exception as e:
-            # 修改日志信息
-            logger.error(f"Search error: {e}")
+            logger.error(f"Suggest error: {e}")
             return []
 
+    def bulk(self, actions, raise_on_error=True):
+        """
+        批量写入文档，actions 为 helpers.bulk 格式，返回 (成功数, 错误列表)。
+
+        raise_on_error 为 True 时有文档写入失败即抛出 BulkIndexError；为 False 时失败的文档放在错误列表中返回。
+        """
+        # 集群写线程池满时返回 429，helpers 会对被拒绝的文档指数退避重试
+        return helpers.bulk(self.os, actions, max_retries=BULK_MAX_RETRIES, initial_backoff=BULK_INITIAL_BACKOFF,
+                            max_backoff=BULK_MAX_BACKOFF, raise_on_error=raise_on_error)
+
+    def iter_documents(self, batch_size=1000):
+        """遍历索引中的全部文档，逐个返回 (_id, _source)，用于导出快照"""
+        for hit in helpers.scan(self.os, index=self.index_name, query={'query': {'match_all': {}}},
+                                size=batch_size, preserve_order=False):
+            yield hit['_id'], hit['_source']
+
+    def begin_bulk_load(self):
+        """大批量导入前关闭自动刷新，减少段合并，导入速度只受 bulk 吞吐限制"""
+        self.os.indices.put_settings(index=self.index_name, body={'index': {'refresh_interval': '-1'}})
+
+    def end_bulk_load(self):
+        """恢复自动刷新并立即刷新，使导入的文档可检索"""
+        self.os.indices.put_settings(index=self.index_name, body={'index': {'refresh_interval': None}})
+        self.os.indices.refresh(index=self.index_name)
+
+    def delete_pdf(self, pdf_path):
+        """
+        删除某个 PDF 文件的所有页面文档，返回删除的文档数。
+
+        按文件标识（完整路径的哈希）删除，其他目录中的同名文件不受影响。
+        """
+        try:
+            response = self.os.delete_by_query(
+                index=self.index_name,
+                body={'query': {'term': {'文件标识': file_key(pdf_path)}}},
+                refresh=True
+            )
+            return response.get('deleted', 0)
+        except Exception as e:
+            logger.error(f"Error deleting documents of {pdf_path}: {e}")
+            return 0
+
+    def delete_index(self):
+        """删除整个索引（如果存在）"""
+        if self.os.indices.exists(index=self.index_name):
+            self.os.indices.delete(index=self.index_name)
+            logger.info(f"Deleted index: {self.index_name}")
+
 
 def main():
     # 将客户端类实例化改为新的类名
@@ -1,20 +1,30 @@
 import os
 import logging
+import time
+from contextlib import nullcontext
 from search_model import SearchModel
-from opensearch_client import OSClient
-from opensearchpy import OpenSearch, helpers # <-- 导入 helpers
+from metrics import STAGE_SECONDS, STAGE_ERRORS, FILE_BYTES, FILE_PAGES
+from throttle import is_rejection
 from io import StringIO
-from pdfminer.layout import LAParams
 
 # 设置日志
 #logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+class ScanCancelled(Exception):
+    """扫描被停止，正在提取的文件需要在下次扫描时重新处理"""
+
 class PDFProcessor:
     """处理PDF文件的类，提取文本内容并获取文件元数据"""
-    def __init__(self, os_client):
+    def __init__(self, os_client, progress=None, profiler=None):
         self.os_client = os_client
-    def extract_text_with_pdfminer_six(self,pdf_path):
+        self.progress = progress # 可选的 ScanProgress，每个文件上报一次页数
+        self.profiler = profiler # 可选的 ExtractionProfiler，记录每个文件的提取耗时和内存
+        self.should_stop = None # 可选的回调，返回 True 时在下一页之前中断提取
+        self.controller = None # 可选的 AdaptiveController，限制并发 bulk 并接收延迟/拒绝信号
+    def extract_text_with_pdfminer_six(self,pdf_path, should_stop=None):
+        should_stop = should_stop or self.should_stop
         pages_text = []
         try:
             # 创建一个 StringIO 对象来捕获提取的文本
@@ -23,6 +33,8 @@ class PDFProcessor:
             # 配置 LAParams 对象，可以调整参数来优化文本布局解析
             # 例如：all_texts=True 可以尝试提取所有文本对象，包括被遮挡的
             # detect_vertical=True 可以帮助处理垂直文本
+            # pdfminer 导入较慢，只在真正提取时才加载，避免拖慢只做检索的命令行启动
+            from pdfminer.layout import LAParams
             laparams = LAParams()
 
             # 使用 extract_text_to_fp 提取文本到 StringIO 对象
@@ -42,6 +54,8 @@ class PDFProcessor:
 
             with open(pdf_path, 'rb') as fp:
                 for page_num, page in enumerate(PDFPage.get_pages(fp, caching=True, check_extractable=True), start=1):
+                    if should_stop and should_stop():
+                        raise ScanCancelled(f"Extraction of {pdf_path} cancelled at page {page_num}")
                     output_string = StringIO()
                     device = TextConverter(resource_manager, output_string, laparams=laparams)
                     interpreter = PDFPageInterpreter(resource_manager, device)
@@ -63,6 +77,8 @@ class PDFProcessor:
 
             return pages_text
 
+        except ScanCancelled:
+            raise
         except FileNotFoundError:
             logger.error(f"PDF file not found: {pdf_path}")
             return []
@@ -70,16 +86,36 @@ class PDFProcessor:
             logger.error(f"Error processing PDF file {pdf_path} with pdfminer.six: {e}")
             return []
         
-    def index_pdf(self, pdf_path):
-        """将PDF文件的每页内容批量索引到Elasticsearch"""
+    def index_pdf(self, pdf_path, progress=None, should_stop=None, replace=False):
+        """
+        将PDF文件的每页内容批量索引到Elasticsearch。
+
+        多个扫描器共用一个 PDFProcessor 时，由调用方传入各自的 progress 和 should_stop，
+        未传入时使用实例属性。
+        replace 为 True（文件以前索引过）时，写入前先删除该文件的旧文档：
+        修改后页数变少时不会残留多出的页，旧版本以随机 _id 写入的文档也不会与新文档重复。
+        """
+        progress = progress or self.progress
         logger.info(f"Indexing PDF: {pdf_path}")
         esmodel = SearchModel()
         esmodel.parse_fname(pdf_path,os.path.basename(pdf_path))
-        pages = self.extract_text_with_pdfminer_six(pdf_path)
+        profile = self.profiler.profile(pdf_path) if self.profiler else nullcontext({})
+        with STAGE_SECONDS.time(stage='extract'), profile as profile_record:
+            pages = self.extract_text_with_pdfminer_six(pdf_path, should_stop)
+            profile_record['pages'] = len(pages)
         if not pages:
             logger.error(f"Failed to extract content from PDF: {pdf_path}")
+            STAGE_ERRORS.inc(stage='extract')
             return False
+        FILE_PAGES.observe(len(pages))
+        try:
+            FILE_BYTES.observe(os.path.getsize(pdf_path))
+        except OSError:
+            pass
+        if progress:
+            progress.add_pages(len(pages))
 
+        # 文档 _id 由文件标识（文件路径的哈希）和页号确定：重复索引（重新扫描、多个节点）覆盖原文档而不是产生重复
         documents_for_bulk = []
         for page in pages:
             # 1. 获取实例的变量名称和值
@@ -95,26 +131,44 @@ class PDFProcessor:
             # 2. 构建符合 Elasticsearch 批量索引格式的字典
             bulk_item = {
                 "_index": self.os_client.index_name, # 使用实例的索引名称
+                "_id": f"{esmodel.文件标识}-{page['页号']}",
                 "_source": source_data # 将变量名称和值构成的字典作为文档源数据
                 # 如果你想确保是创建新文档而不是更新，可以添加 "_op_type": "create"
                 # "_op_type": "create"
             }
             documents_for_bulk.append(bulk_item)
 
+        bulk_slot = self.controller.bulk_slot() if self.controller else nullcontext()
+        with bulk_slot:
+            if replace:
+                # 提取成功后才删除旧文档，提取失败时保留旧版本的检索结果
+                deleted = self.os_client.delete_pdf(pdf_path)
+                logger.info(f"Deleted {deleted} previously indexed documents of {pdf_path}")
+            return self._bulk_index(pdf_path, documents_for_bulk)
+
+    def _bulk_index(self, pdf_path, documents_for_bulk):
+        start = time.perf_counter()
         try:
-            # bulk(self.es, actions)
-            #opensearchpy.helpers.bulk(self.es, documents_for_bulk)
-            success_count, errors = helpers.bulk(self.os_client.os, documents_for_bulk)
+            # 由检索后端完成批量写入（OpenSearch 使用 helpers.bulk，SQLite 后端写入 FTS5 表）
+            with STAGE_SECONDS.time(stage='bulk'):
+                success_count, errors = self.os_client.bulk(documents_for_bulk)
+            if self.controller:
+                self.controller.record_bulk(time.perf_counter() - start)
             if errors:
                 logger.error(f"Bulk indexing for {pdf_path} finished with errors. Success count: {success_count}")
                 # 您可能需要进一步检查 errors 列表以查看具体哪些文档索引失败了
                 # logger.error(f"Bulk errors: {errors}") # 注意：errors 可能很大，谨慎打印
-            else:
-                logger.info(f"Successfully bulk indexed {success_count} documents from {pdf_path}")
+                # 有页面没写入时不能记为已索引，否则下次扫描不会重试
+                STAGE_ERRORS.inc(stage='bulk')
+                return False
+            logger.info(f"Successfully bulk indexed {success_count} documents from {pdf_path}")
 
             return True
         except Exception as e:
             logger.error(f"Error bulk indexing {pdf_path}: {e}")
+            STAGE_ERRORS.inc(stage='bulk')
+            if self.controller:
+                self.controller.record_bulk(time.perf_counter() - start, rejected=is_rejection(e))
             return False
     def index_directory(self, directory):
         """索引指定目录中的所有PDF文件"""
@@ -135,7 +189,8 @@ def main():
 
     # 初始化索引器
     from sys_config import SysConfig
-    config = SysConfig.load_config().get("opeansearch")
+    from opensearch_client import OSClient
+    config = SysConfig.load_config().get("opensearch")
     indexer = OSClient(config)
     indexer.create_index()
 
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+
+
+class ScanProgress:
+    """
+    扫描进度计数器，由扫描线程按文件更新，界面线程定期读取快照。
+
+    只在每个文件开始/结束时更新一次（不在每页更新），锁内只做几次整数加法，
+    对索引主流程的开销可以忽略。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {} # 正在处理的文件 -> 开始时间
+        self.state = 'idle'
+        self.directory = ''
+        self.started_at = None
+        self.seen = 0 # 遍历到的 PDF 文件数
+        self.discovered = 0 # 需要索引（新增或已修改）的文件数
+        self.discovered_bytes = 0
+        self.skipped = 0 # 已索引且未修改、跳过的文件数
+        self.indexed = 0
+        self.errors = 0
+        self.pages = 0
+        self.bytes = 0 # 已处理文件的字节数
+
+    def start_scan(self, directory):
+        """开始新一轮扫描，清零本轮计数"""
+        with self._lock:
+            self._in_flight.clear()
+            self.state = 'discovering'
+            self.directory = directory
+            self.started_at = time.time()
+            self.seen = self.discovered = self.discovered_bytes = 0
+            self.skipped = self.indexed = self.errors = self.pages = self.bytes = 0
+
+    def set_state(self, state):
+        with self._lock:
+            self.state = state
+
+    def file_seen(self, needs_indexing, size=0):
+        """遍历到一个 PDF 文件"""
+        with self._lock:
+            self.seen += 1
+            if needs_indexing:
+                self.discovered += 1
+                self.discovered_bytes += size
+            else:
+                self.skipped += 1
+
+    def file_started(self, path):
+        with self._lock:
+            self._in_flight[path] = time.time()
+
+    def file_finished(self, path, success, size=0):
+        with self._lock:
+            self._in_flight.pop(path, None)
+            if success:
+                self.indexed += 1
+            else:
+                self.errors += 1
+            self.bytes += size
+
+    def file_abandoned(self, path):
+        """文件处理被中断，既不算完成也不算错误"""
+        with self._lock:
+            self._in_flight.pop(path, None)
+
+    def file_handed_off(self, path, size=0):
+        """文件由其他节点处理或已被其他节点索引，从本节点的待处理数中扣除，计为跳过"""
+        with self._lock:
+            self._in_flight.pop(path, None)
+            self.discovered -= 1
+            self.discovered_bytes -= size
+            self.skipped += 1
+
+    def add_pages(self, count):
+        """PDFProcessor 每个文件提取完成后调用一次"""
+        with self._lock:
+            self.pages += count
+
+    def snapshot(self):
+        """返回当前计数的一致快照（dict）"""
+        with self._lock:
+            done = self.indexed + self.errors
+            return {
+                'state': self.state,
+                'directory': self.directory,
+                'started_at': self.started_at,
+                'seen': self.seen,
+                'discovered': self.discovered,
+                'discovered_bytes': self.discovered_bytes,
+                'skipped': self.skipped,
+                'indexed': self.indexed,
+                'errors': self.errors,
+                'done': done,
+                'pending': max(self.discovered - done, 0),
+                'pages': self.pages,
+                'bytes': self.bytes,
+                'in_flight': sorted(self._in_flight, key=self._in_flight.get),
+            }
+
+
+class CombinedProgress:
+    """多个根目录同时扫描时，把各自的 ScanProgress 快照合并成一个，界面和日志按总量显示"""
+    _SUMMED = ('seen', 'discovered', 'discovered_bytes', 'skipped', 'indexed', 'errors', 'done', 'pending', 'pages', 'bytes')
+
+    def __init__(self, progresses):
+        self.progresses = progresses
+
+    def snapshot(self):
+        snaps = [progress.snapshot() for progress in self.progresses]
+        combined = {key: sum(snap[key] for snap in snaps) for key in self._SUMMED}
+        states = set(snap['state'] for snap in snaps)
+        # 任一根目录仍在遍历时总量未知，不显示预计剩余时间
+        combined['state'] = next((state for state in ('discovering', 'indexing') if state in states), 'idle')
+        combined['directory'] = ', '.join(snap['directory'] for snap in snaps if snap['directory'])
+        started = [snap['started_at'] for snap in snaps if snap['started_at']]
+        combined['started_at'] = min(started) if started else None
+        combined['in_flight'] = [path for snap in snaps for path in snap['in_flight']]
+        return combined
+
+
+class RollingRate:
+    """根据定期采样的累计值计算最近 window 秒内的速率（每秒）"""
+    def __init__(self, window=30.0):
+        self.window = window
+        self._samples = deque()
+
+    def add(self, value, now=None):
+        now = time.time() if now is None else now
+        # 计数被清零（新一轮扫描）时重新开始采样
+        if self._samples and value < self._samples[-1][1]:
+            self._samples.clear()
+        self._samples.append((now, value))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    def rate(self):
+        if len(self._samples) < 2:
+            return 0.0
+        (t0, v0), (t1, v1) = self._samples[0], self._samples[-1]
+        return (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0
+
+
+def format_eta(seconds):
+    """把秒数格式化为 H:MM:SS，无法估计时返回 '--'"""
+    if seconds is None:
+        return '--'
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
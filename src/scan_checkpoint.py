@@ -0,0 +1,173 @@
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ScanCheckpointManager:
+    """
+    在 SQLite 中保存扫描会话的断点，程序停止、重启或崩溃后可以从断点继续。
+
+    每个扫描根目录最多有一个未完成的会话：
+    - scan_sessions 记录目录遍历到的位置（已完成遍历的最后一个子目录）以及遍历是否已结束；
+    - scan_queue 记录已发现但还没有处理的文件。
+    遍历按排序后的目录名进行（前序遍历），因此位置可以用相对路径的分量元组比较大小。
+    """
+    def __init__(self, db_path="indexed_files.db"):
+        self.db_path = db_path
+        self._create_tables()
+
+    def _get_connection(self):
+        """获取数据库连接"""
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _create_tables(self):
+        """创建断点相关的表"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_sessions (
+                    root TEXT PRIMARY KEY, -- 扫描根目录
+                    walk_position TEXT, -- 已完成遍历的最后一个目录（相对路径分量的 JSON 列表）
+                    walk_done BOOLEAN DEFAULT 0, -- 目录遍历是否已结束
+                    started_time REAL,
+                    updated_time REAL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_queue (
+                    root TEXT,
+                    file_path TEXT,
+                    modification_time REAL,
+                    size INTEGER,
+                    PRIMARY KEY (root, file_path)
+                )
+            ''')
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error creating checkpoint tables: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def load_session(self, root):
+        """
+        读取未完成的扫描会话。
+
+        Returns:
+            dict 或 None: {'walk_position': tuple 或 None, 'walk_done': bool, 'pending': [(path, mtime, size), ...]}
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT walk_position, walk_done FROM scan_sessions WHERE root = ?", (root,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "SELECT file_path, modification_time, size FROM scan_queue WHERE root = ? ORDER BY rowid", (root,))
+            return {
+                'walk_position': tuple(json.loads(row[0])) if row[0] is not None else None,
+                'walk_done': bool(row[1]),
+                'pending': cursor.fetchall(),
+            }
+        except sqlite3.Error as e:
+            logger.error(f"Error loading scan checkpoint for {root}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def start_session(self, root):
+        """创建新的扫描会话（清除该目录残留的队列）"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            now = time.time()
+            cursor.execute("DELETE FROM scan_queue WHERE root = ?", (root,))
+            cursor.execute(
+                "INSERT OR REPLACE INTO scan_sessions (root, walk_position, walk_done, started_time, updated_time) "
+                "VALUES (?, NULL, 0, ?, ?)", (root, now, now))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error starting scan session for {root}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def checkpoint_directory(self, root, position, files):
+        """
+        一个目录遍历完成：在同一事务中把发现的待处理文件加入队列并推进遍历位置。
+
+        Args:
+            root (str): 扫描根目录。
+            position (tuple): 该目录相对 root 的路径分量。
+            files (list): [(path, mtime, size), ...]
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO scan_queue (root, file_path, modification_time, size) VALUES (?, ?, ?, ?)",
+                [(root, path, mtime, size) for path, mtime, size in files])
+            cursor.execute(
+                "UPDATE scan_sessions SET walk_position = ?, updated_time = ? WHERE root = ?",
+                (json.dumps(list(position), ensure_ascii=False), time.time(), root))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving scan checkpoint for {root}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def add_pending(self, root, files):
+        """把文件加入队列但不推进遍历位置（用于先于正常遍历处理的置顶目录）"""
+        if files:
+            self._executemany(
+                "INSERT OR REPLACE INTO scan_queue (root, file_path, modification_time, size) VALUES (?, ?, ?, ?)",
+                [(root, path, mtime, size) for path, mtime, size in files])
+
+    def mark_walk_done(self, root):
+        """目录遍历结束，之后恢复时不再遍历，只处理队列"""
+        self._execute("UPDATE scan_sessions SET walk_done = 1, updated_time = ? WHERE root = ?", (time.time(), root))
+
+    def remove_pending(self, root, file_path):
+        """文件处理完成（成功或失败都已记录到 indexed_files），从队列移除"""
+        self._execute("DELETE FROM scan_queue WHERE root = ? AND file_path = ?", (root, file_path))
+
+    def finish_session(self, root):
+        """扫描会话全部完成，删除断点"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM scan_queue WHERE root = ?", (root,))
+            cursor.execute("DELETE FROM scan_sessions WHERE root = ?", (root,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error finishing scan session for {root}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _execute(self, sql, params):
+        self._executemany(sql, [params])
+
+    def _executemany(self, sql, rows):
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.executemany(sql, rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error updating scan checkpoint: {e}")
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+
+from file_scanner import FileScanner
+from pdf_processor import PDFProcessor
+from progress import CombinedProgress
+from extraction_profiler import create_profiler
+from throttle import create_controller
+from work_queue import create_work_queue
+from leases import create_lease_manager
+
+logger = logging.getLogger(__name__)
+
+# 没有安装 watchdog 时，watch 模式的根目录按这个间隔轮询
+WATCH_POLL_SECONDS = 10
+# 收到文件变化通知后再等一会儿，让正在复制的文件写完，并把一批变化合并成一次扫描
+WATCH_DEBOUNCE_SECONDS = 2
+
+
+def load_roots(config, directory=None, interval=None):
+    """
+    读取扫描根目录列表（app_settings.roots），未配置时使用 app_settings.pdf_directory。
+
+    Args:
+        directory (str): 指定时只扫描这个目录（命令行 --dir、界面中选择的目录）。
+        interval (int): 指定时覆盖所有根目录的扫描间隔。
+
+    Returns:
+        list: [{'path', 'interval_seconds', 'watch', 'include', 'exclude', 'worker_share'}, ...]
+    """
+    app_settings = config.get('app_settings', {})
+    if directory:
+        entries = [{'path': directory}]
+    else:
+        entries = app_settings.get('roots') or [{'path': app_settings.get('pdf_directory', '')}]
+    default_interval = app_settings.get('scan_interval_seconds', 300)
+    return [{
+        'path': entry['path'],
+        'interval_seconds': interval or entry.get('interval_seconds', default_interval),
+        'watch': entry.get('watch', False),
+        'include': entry.get('include', []),
+        'exclude': entry.get('exclude', []),
+        'worker_share': entry.get('worker_share', 1.0),
+    } for entry in entries]
+
+
+class RootScheduler:
+    """
+    在一个进程内按各自的间隔（或 watch 模式）同时扫描多个根目录。
+
+    每个根目录有自己的 FileScanner（断点、优先队列和进度互不影响），
+    它们共用同一个 PDFProcessor（检索后端的 bulk 写入）和 AdaptiveController（提取线程名额），
+    小而热的目录可以频繁扫描，不必每次都遍历冷的历史档案。
+    """
+    def __init__(self, roots, scanner_factory):
+        self.roots = roots
+        self.scanners = [scanner_factory(root) for root in roots]
+        self.progress = CombinedProgress([scanner.progress for scanner in self.scanners])
+        self._stop_event = threading.Event()
+        self._wakeups = [threading.Event() for _ in roots] # watch 模式下由文件变化通知触发
+        self._observer = None
+
+    def scan_once(self):
+        """所有根目录各扫描一次（并行），全部完成后返回"""
+        self._run_threads(self._scan)
+
+    def run(self):
+        """持续按计划扫描所有根目录，直到 stop 被调用"""
+        self._start_watchers()
+        try:
+            self._run_threads(self._root_loop)
+        finally:
+            if self._observer:
+                self._observer.stop()
+                self._observer.join()
+                self._observer = None
+        logger.info("Scheduler stopped.")
+
+    def stop(self):
+        """停止所有根目录的扫描和等待，进度已写入断点"""
+        self._stop_event.set()
+        for wakeup in self._wakeups:
+            wakeup.set()
+        for scanner in self.scanners:
+            scanner.stop_scanning()
+
+    def is_stopping(self):
+        return self._stop_event.is_set()
+
+    def _run_threads(self, target):
+        threads = [
+            threading.Thread(target=target, args=(index,), name=f"root-{index}", daemon=True)
+            for index in range(len(self.roots))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _scan(self, index):
+        root = self.roots[index]
+        try:
+            self.scanners[index].scan_and_index_directory(root['path'])
+        except Exception as e:
+            logger.error(f"Error scanning {root['path']}: {e}")
+
+    def _root_loop(self, index):
+        root = self.roots[index]
+        wakeup = self._wakeups[index]
+        while not self._stop_event.is_set():
+            wakeup.clear()
+            self._scan(index)
+            if self._stop_event.is_set():
+                break
+            if root['watch'] and self._observer is None:
+                # 没有文件变化通知，改为短间隔轮询（热目录很小，重扫的代价可以忽略）
+                timeout = min(root['interval_seconds'], WATCH_POLL_SECONDS)
+            else:
+                timeout = root['interval_seconds']
+            logger.info(f"Scan of {root['path']} finished. Next scan in {timeout} seconds"
+                        f"{' or on file changes' if root['watch'] and self._observer else ''}.")
+            # 间隔到期、文件变化通知或停止请求都会唤醒
+            if wakeup.wait(timeout) and not self._stop_event.is_set():
+                self._stop_event.wait(WATCH_DEBOUNCE_SECONDS)
+
+    def _start_watchers(self):
+        """为 watch 模式的根目录注册文件变化通知；没有安装 watchdog 时退回轮询"""
+        watched = [index for index, root in enumerate(self.roots) if root['watch'] and os.path.isdir(root['path'])]
+        if not watched:
+            return
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info(f"watchdog is not installed; watched roots are polled every {WATCH_POLL_SECONDS} seconds.")
+            return
+
+        class PDFChangeHandler(FileSystemEventHandler):
+            def __init__(self, wakeup):
+                self.wakeup = wakeup
+
+            def on_any_event(self, event):
+                path = getattr(event, 'dest_path', '') or event.src_path
+                if not event.is_directory and str(path).lower().endswith('.pdf'):
+                    self.wakeup.set()
+
+        self._observer = Observer()
+        for index in watched:
+            self._observer.schedule(PDFChangeHandler(self._wakeups[index]), self.roots[index]['path'], recursive=True)
+        self._observer.start()
+        logger.info(f"Watching {len(watched)} roots for file changes.")
+
+
+def build_scheduler(config, roots, search_client, db_manager):
+    """创建各根目录共用的 PDFProcessor、并发控制和租约，以及每个根目录的 FileScanner"""
+    pdf_processor = PDFProcessor(search_client, profiler=create_profiler(config))
+    controller = create_controller(config)
+    leases = create_lease_manager(config)
+
+    def scanner_factory(root):
+        return FileScanner(db_manager, pdf_processor, controller=controller, work_queue=create_work_queue(config),
+                           leases=leases, include=root['include'], exclude=root['exclude'],
+                           worker_share=root['worker_share'])
+
+    return RootScheduler(roots, scanner_factory)
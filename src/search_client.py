@@ -0,0 +1,23 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def create_search_client(config):
+    """
+    根据配置中的 app_settings.search_backend 创建检索后端。
+
+    Args:
+        config (dict): SysConfig.load_config() 返回的完整配置。
+
+    Returns:
+        OSClient 或 SQLiteSearchClient，二者提供相同的 create_index/bulk/search/suggest/delete_pdf/delete_index 接口。
+    """
+    backend = config.get('app_settings', {}).get('search_backend', 'opensearch')
+    if backend == 'sqlite':
+        from sqlite_search_client import SQLiteSearchClient
+        return SQLiteSearchClient(config.get('sqlite_search', {}))
+    if backend == 'opensearch':
+        from opensearch_client import OSClient
+        return OSClient(config.get('opensearch', {}))
+    raise ValueError(f"Unknown search backend: {backend}")
@@ -1,8 +1,15 @@
 
 import os
+import hashlib
 from datetime import date
 import json
 
+
+def file_key(path):
+    """由文件完整路径生成的文件标识，同名文件位于不同目录时也不相同"""
+    return hashlib.sha1(path.encode('utf-8')).hexdigest()
+
+
 class SearchModel:
     def __init__(self) -> None:
         self.患者名= ""
@@ -12,6 +19,7 @@ class SearchModel:
         self.文件类型=''
         self.文件目录=''
         self.文件名称=''
+        self.文件标识='' # 文件完整路径的哈希，用于按文件删除页面文档
         self.页号=0
         self.页内容=''
 
@@ -23,6 +31,7 @@ class SearchModel:
         self.文件类型=txt_list[1]
         self.文件目录=""
         self.文件名称=fname
+        self.文件标识=file_key(path)
 
     def toJSON(self):
         return json.dumps(self, default=lambda o: o.__dict__, indent=4,ensure_ascii=False)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from search_model import SearchModel
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'pdf-indexer-snapshot'
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# 快照中保存的字段与 SearchModel 一致
+SNAPSHOT_FIELDS = list(vars(SearchModel()).keys())
+
+
+class SnapshotError(Exception):
+    """快照不完整或校验失败"""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_snapshot(client, out_dir, chunk_docs=50000):
+    """
+    把索引中所有页面文档导出为 gzip 压缩的分块 NDJSON 文件和 manifest.json。
+
+    每行为 {"_id": ..., "_source": {...}}，_source 只保留 SearchModel 的字段。
+    manifest 最后写入，存在 manifest 即表示快照完整。
+
+    Returns:
+        dict: manifest 内容。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(os.path.join(out_dir, MANIFEST_FILE)):
+        raise SnapshotError(f"{out_dir} already contains a snapshot")
+
+    chunks = []
+    writer = None
+    count = 0
+
+    def close_chunk():
+        writer.close()
+        path = os.path.join(out_dir, chunks[-1]['file'])
+        chunks[-1].update(bytes=os.path.getsize(path), sha256=_sha256(path))
+        logger.info(f"Wrote snapshot chunk {chunks[-1]['file']} ({chunks[-1]['documents']} documents)")
+
+    for doc_id, source in client.iter_documents():
+        if writer is None or chunks[-1]['documents'] >= chunk_docs:
+            if writer is not None:
+                close_chunk()
+            chunks.append({'file': f"part-{len(chunks):05d}.ndjson.gz", 'documents': 0})
+            writer = gzip.open(os.path.join(out_dir, chunks[-1]['file']), 'wt', encoding='utf-8')
+        document = {'_id': doc_id, '_source': {field: source.get(field) for field in SNAPSHOT_FIELDS}}
+        writer.write(json.dumps(document, ensure_ascii=False) + '\n')
+        chunks[-1]['documents'] += 1
+        count += 1
+    if writer is not None:
+        close_chunk()
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'index_name': client.index_name,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'fields': SNAPSHOT_FIELDS,
+        'document_count': count,
+        'chunks': chunks,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    logger.info(f"Exported {count} documents in {len(chunks)} chunks to {out_dir}")
+    return manifest
+
+
+def load_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise SnapshotError(f"No {MANIFEST_FILE} in {snapshot_dir} (incomplete or not a snapshot)")
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT or manifest.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format in {snapshot_dir}")
+    return manifest
+
+
+def _import_chunk(client, snapshot_dir, chunk, batch_size, verify):
+    """导入一个分块，返回 (成功数, 错误数)"""
+    path = os.path.join(snapshot_dir, chunk['file'])
+    if verify and _sha256(path) != chunk['sha256']:
+        raise SnapshotError(f"Checksum mismatch for {chunk['file']}")
+    success_count = error_count = 0
+
+    def flush(actions):
+        # 单个文档被拒绝时计入错误数继续导入，而不是让整个导入中途失败
+        success, errors = client.bulk(actions, raise_on_error=False)
+        for error in errors[:3]:
+            logger.error(f"Failed to import document from {chunk['file']}: {error}")
+        return success, len(errors)
+
+    actions = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            document = json.loads(line)
+            action = {'_index': client.index_name, '_source': document['_source']}
+            if document.get('_id') is not None:
+                action['_id'] = document['_id']
+            actions.append(action)
+            if len(actions) >= batch_size:
+                success, errors = flush(actions)
+                success_count, error_count = success_count + success, error_count + errors
+                actions = []
+    if actions:
+        success, errors = flush(actions)
+        success_count, error_count = success_count + success, error_count + errors
+    logger.info(f"Imported snapshot chunk {chunk['file']}: {success_count} documents, {error_count} errors")
+    return success_count, error_count
+
+
+def import_snapshot(client, snapshot_dir, streams=4, batch_size=500, verify=True):
+    """
+    把快照批量导入索引，不需要重新解析 PDF。
+
+    多个分块由 streams 个线程并行导入；导入期间关闭索引自动刷新。
+
+    Returns:
+        tuple: (成功导入的文档数, 错误数)
+    """
+    manifest = load_manifest(snapshot_dir)
+    start = time.time()
+    client.create_index()
+    client.begin_bulk_load()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, streams)) as executor:
+            results = list(executor.map(
+                lambda chunk: _import_chunk(client, snapshot_dir, chunk, batch_size, verify), manifest['chunks']))
+    finally:
+        client.end_bulk_load()
+    success_count = sum(success for success, _ in results)
+    error_count = sum(errors for _, errors in results)
+    elapsed = time.time() - start
+    logger.info(f"Imported {success_count}/{manifest['document_count']} documents from {snapshot_dir} "
+                f"in {elapsed:.1f}s ({error_count} errors)")
+    return success_count, error_count
@@ -0,0 +1,304 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+
+from search_model import file_key
+
+logger = logging.getLogger(__name__)
+
+# FTS5 的 unicode61 分词器会把连续的中文当成一个词，无法按词检索。
+# 这里在每个 CJK 字符后插入零宽空格(U+200B)，unicode61 把它当作分隔符，
+# 中文就被切成单字索引；查询时把中文词组当作短语匹配，保证字符相邻。
+_ZWSP = '\u200b'
+_CJK_RE = re.compile('([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+# 等待其他进程释放写锁的秒数
+_BUSY_TIMEOUT = 30
+
+
+def segment_cjk(text):
+    """在 CJK 字符之间插入分隔符，供 FTS5 建索引"""
+    return _CJK_RE.sub('\\1' + _ZWSP, text)
+
+
+def build_match_query(query):
+    """把用户输入转成 FTS5 MATCH 表达式：每个词作为短语，词之间为 OR（与 OpenSearch match 查询一致）"""
+    phrases = []
+    for term in query.split():
+        tokens = segment_cjk(term).replace(_ZWSP, ' ').split()
+        if tokens:
+            phrases.append('"' + ' '.join(tokens).replace('"', '""') + '"')
+    return ' OR '.join(phrases)
+
+
+class SQLiteSearchClient:
+    """基于 SQLite FTS5 的本地检索后端，接口与 OSClient 相同，适用于没有 OpenSearch 的小型站点"""
+    def __init__(self, config):
+        self.db_path = config.get("db_path", "search_index.db")
+        self.index_name = config.get("index_name", "medical_records")
+        if not _NAME_RE.match(self.index_name):
+            raise ValueError(f"Invalid index name for SQLite backend: {self.index_name}")
+        # 与 OSClient 保持一致的属性，本后端没有远程连接
+        self.os = None
+        # 同一进程内多个索引线程的写入串行进行，避免互相等待 SQLite 写锁
+        self._write_lock = threading.Lock()
+        logger.info(f"Using SQLite FTS5 search backend at {self.db_path}")
+
+    def _get_connection(self):
+        """获取数据库连接"""
+        return sqlite3.connect(self.db_path, timeout=_BUSY_TIMEOUT, check_same_thread=False)
+
+    @property
+    def _docs_table(self):
+        return f"{self.index_name}_docs"
+
+    @property
+    def _fts_table(self):
+        return f"{self.index_name}_fts"
+
+    def create_index(self):
+        """创建文档表和全文索引表（如果不存在）"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self._docs_table} (
+                    rowid INTEGER PRIMARY KEY,
+                    doc_id TEXT UNIQUE, -- 对应 OpenSearch 的 _id，可为空
+                    file_name TEXT, -- 文件名称，用于前缀联想
+                    admission_no TEXT, -- 住院号，用于前缀联想
+                    file_key TEXT, -- 文件标识（完整路径的哈希），用于按文件删除
+                    source TEXT -- 文档 _source 的 JSON
+                )
+            ''')
+            self._migrate(cursor)
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{self.index_name}_file_name ON {self._docs_table} (file_name)
+            ''')
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{self.index_name}_file_key ON {self._docs_table} (file_key)
+            ''')
+            # 前缀联想不区分大小写（与 OpenSearch .prefix 子字段的 lowercase 一致），索引使用 NOCASE 排序规则
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{self.index_name}_file_name_nocase
+                ON {self._docs_table} (file_name COLLATE NOCASE)
+            ''')
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_{self.index_name}_admission_no_nocase
+                ON {self._docs_table} (admission_no COLLATE NOCASE)
+            ''')
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {self._fts_table} USING fts5(content, tokenize = 'unicode61')
+            ''')
+            conn.commit()
+            logger.info(f"SQLite index {self.index_name} checked/created at {self.db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Error creating SQLite index: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def _migrate(self, cursor):
+        """升级旧版本创建的文档表：补上 admission_no、file_key 列并从 source JSON 回填，删除区分大小写的旧索引"""
+        cursor.execute(f"PRAGMA table_info({self._docs_table})")
+        columns = [row[1] for row in cursor.fetchall()]
+        if 'admission_no' not in columns:
+            logger.info(f"Migrating {self._docs_table}: adding admission_no column")
+            cursor.execute(f"ALTER TABLE {self._docs_table} ADD COLUMN admission_no TEXT")
+            cursor.execute(f"""UPDATE {self._docs_table} SET admission_no = json_extract(source, '$."住院号"')""")
+        if 'file_key' not in columns:
+            # 旧文档的 source 中没有文件标识，回填后仍为空，重新索引该文件时不会被删除
+            logger.info(f"Migrating {self._docs_table}: adding file_key column")
+            cursor.execute(f"ALTER TABLE {self._docs_table} ADD COLUMN file_key TEXT")
+            cursor.execute(f"""UPDATE {self._docs_table} SET file_key = json_extract(source, '$."文件标识"')""")
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{self.index_name}_admission_no")
+
+    def bulk(self, actions, raise_on_error=True):
+        """
+        批量写入文档，actions 为 helpers.bulk 格式，返回 (成功数, 错误列表)。
+
+        单个文档的内容错误（缺少 _source、create 冲突）总是记入错误列表（raise_on_error 仅为与 OSClient 接口一致）；
+        数据库错误（如写锁超时）回滚整批并抛出，与 helpers.bulk 出错时抛出异常一致。
+        """
+        conn = None
+        with self._write_lock:
+            try:
+                conn = self._get_connection()
+                success_count, errors = self._bulk_write(conn, actions)
+                conn.commit()
+            except sqlite3.Error:
+                if conn:
+                    conn.rollback()
+                raise
+            finally:
+                if conn:
+                    conn.close()
+        return success_count, errors
+
+    def _bulk_write(self, conn, actions):
+        success_count = 0
+        errors = []
+        cursor = conn.cursor()
+        for action in actions:
+            op_type = action.get('_op_type', 'index')
+            doc_id = action.get('_id')
+            try:
+                if op_type == 'delete':
+                    self._delete_doc(cursor, doc_id)
+                else:
+                    source = action['_source']
+                    if doc_id is not None:
+                        if op_type == 'create' and self._doc_exists(cursor, doc_id):
+                            raise ValueError(f"document {doc_id} already exists")
+                        self._delete_doc(cursor, doc_id)
+                    cursor.execute(
+                        f"INSERT INTO {self._docs_table} (doc_id, file_name, admission_no, file_key, source) VALUES (?, ?, ?, ?, ?)",
+                        (doc_id, source.get('文件名称'), source.get('住院号'), source.get('文件标识'),
+                         json.dumps(source, ensure_ascii=False))
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {self._fts_table} (rowid, content) VALUES (?, ?)",
+                        (cursor.lastrowid, segment_cjk(str(source.get('页内容', ''))))
+                    )
+                success_count += 1
+            except (KeyError, ValueError) as e:
+                errors.append({op_type: {'_id': doc_id, 'error': str(e)}})
+        return success_count, errors
+
+    def _doc_exists(self, cursor, doc_id):
+        cursor.execute(f"SELECT 1 FROM {self._docs_table} WHERE doc_id = ?", (doc_id,))
+        return cursor.fetchone() is not None
+
+    def _delete_doc(self, cursor, doc_id):
+        cursor.execute(f"SELECT rowid FROM {self._docs_table} WHERE doc_id = ?", (doc_id,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(f"DELETE FROM {self._fts_table} WHERE rowid = ?", row)
+            cursor.execute(f"DELETE FROM {self._docs_table} WHERE rowid = ?", row)
+
+    def search(self, query, size=10):
+        """全文检索，按 BM25 排序，返回与 OSClient.search 相同结构的页面信息"""
+        match_query = build_match_query(query)
+        if not match_query:
+            return []
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT d.source,
+                       bm25({self._fts_table}),
+                       snippet({self._fts_table}, 0, '<mark>', '</mark>', '...', 64)
+                FROM {self._fts_table} JOIN {self._docs_table} d ON d.rowid = {self._fts_table}.rowid
+                WHERE {self._fts_table} MATCH ?
+                ORDER BY bm25({self._fts_table})
+                LIMIT ?
+            ''', (match_query, size))
+            results = []
+            for source, rank, snippet in cursor.fetchall():
+                source = json.loads(source)
+                results.append({
+                    '文件名称': source.get('文件名称'),
+                    '页号': source.get('页号'),
+                    '页内容': source.get('页内容'),
+                    'score': -rank, # bm25() 越小越相关，取反后与 OpenSearch 的 _score 方向一致
+                    'content_snippet': snippet.replace(_ZWSP, '') if snippet else ''
+                })
+            return results
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def suggest(self, prefix, size=10):
+        """按住院号或文件名称前缀联想，返回去重后的文件列表 [{'住院号', '文件名称'}]"""
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        # 用范围条件代替 LIKE，使查询可以走 file_name/admission_no 上的 NOCASE 索引
+        # （NOCASE 只折叠 ASCII 字母，住院号和文件名中的中文本身没有大小写）
+        upper = prefix + '\U0010ffff'
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT admission_no, file_name FROM {self._docs_table}
+                WHERE admission_no >= ? COLLATE NOCASE AND admission_no < ? COLLATE NOCASE
+                UNION
+                SELECT admission_no, file_name FROM {self._docs_table}
+                WHERE file_name >= ? COLLATE NOCASE AND file_name < ? COLLATE NOCASE
+                ORDER BY file_name
+                LIMIT ?
+            ''', (prefix, upper, prefix, upper, size))
+            return [{'住院号': row[0] or '', '文件名称': row[1] or ''} for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Suggest error: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def iter_documents(self, batch_size=1000):
+        """遍历索引中的全部文档，逐个返回 (_id, _source)，用于导出快照"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT doc_id, source FROM {self._docs_table} ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for doc_id, source in rows:
+                    yield doc_id, json.loads(source)
+        finally:
+            if conn:
+                conn.close()
+
+    def begin_bulk_load(self):
+        """与 OSClient 接口一致；SQLite 后端每批一个事务，无需额外设置"""
+
+    def end_bulk_load(self):
+        """与 OSClient 接口一致"""
+
+    def delete_pdf(self, pdf_path):
+        """删除某个 PDF 文件的所有页面文档（按文件标识，不影响其他目录中的同名文件），返回删除的文档数"""
+        conn = None
+        with self._write_lock:
+            try:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"DELETE FROM {self._fts_table} WHERE rowid IN (SELECT rowid FROM {self._docs_table} WHERE file_key = ?)",
+                    (file_key(pdf_path),)
+                )
+                cursor.execute(f"DELETE FROM {self._docs_table} WHERE file_key = ?", (file_key(pdf_path),))
+                conn.commit()
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Error deleting documents of {pdf_path}: {e}")
+                return 0
+            finally:
+                if conn:
+                    conn.close()
+
+    def delete_index(self):
+        """删除整个索引（如果存在）"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {self._fts_table}")
+            cursor.execute(f"DROP TABLE IF EXISTS {self._docs_table}")
+            conn.commit()
+            logger.info(f"Deleted index: {self.index_name}")
+        finally:
+            if conn:
+                conn.close()
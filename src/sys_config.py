@@ -13,10 +13,51 @@ DEFAULT_CONFIG = {
     },
     "app_settings": {
         "pdf_directory": "/Users/john/Data/projects/es_test/test/pdf_files/",
-        "scan_interval_seconds": 300
+        "scan_interval_seconds": 300,
+        "search_backend": "opensearch", # opensearch 或 sqlite
+        # 多个扫描根目录，为空时扫描 pdf_directory。每项可设置 interval_seconds、watch、include/exclude（相对路径 glob）、worker_share
+        "roots": []
     },
     "database": {
         "db_path": "indexed_files.db"
+    },
+    "sqlite_search": {
+        "db_path": "search_index.db",
+        "index_name": "medical_records"
+    },
+    "metrics": {
+        "http_enabled": False, # 是否提供本地 /metrics 端点
+        "host": "127.0.0.1",
+        "port": 9464,
+        "snapshot_path": "", # 非空时定期把指标快照写入该 JSON 文件
+        "snapshot_interval_seconds": 60
+    },
+    "profiling": {
+        "enabled": False, # 记录每个文件的提取耗时、页数、峰值内存
+        "sample_rate": 0.05, # 用 cProfile 详细分析的文件比例
+        "profile_dir": "profiles",
+        "track_memory": True
+    },
+    "throttle": {
+        "min_workers": 1, # 并发提取线程数下限
+        "max_workers": 4, # 并发提取线程数上限
+        "max_inflight_bulk": 2, # 同时进行的 bulk 请求数上限
+        "target_bulk_latency_ms": 2000, # bulk 平均延迟超过该值时减半并发
+        "max_read_bytes_per_sec": 0, # NAS 读取限速（字节/秒），0 表示不限速
+        "adjust_interval_seconds": 5,
+        "windows": [] # 按时间段覆盖上限，如 {"start": "08:00", "end": "18:00", "max_workers": 1}
+    },
+    "work_queue": {
+        "maxsize": 1000, # 遍历与处理之间的队列长度，队列满时遍历暂停
+        "policy": "newest", # newest: 最新修改的优先；smallest: 最小的优先；fifo: 按发现顺序
+        "pinned_directories": [] # 优先遍历和处理的目录
+    },
+    "cluster": {
+        "enabled": False, # 多个节点共同索引同一目录树
+        "node_id": "", # 为空时使用主机名
+        "lease_seconds": 60, # 文件租约时长，节点宕机后超过该时间由其他节点接手
+        "backend": "sqlite",
+        "db_path": "" # 租约数据库，为空时使用 database.db_path（需放在共享存储上）
     }
 }
 
@@ -26,11 +67,11 @@ logger.setLevel(logging.INFO)
 class SysConfig:
     # --- 配置和状态管理 ---
     @staticmethod
-    def load_config():
+    def load_config(config_file=CONFIG_FILE):
         """加载配置，如果文件不存在则使用默认配置并保存"""
-        if os.path.exists(CONFIG_FILE):
+        if os.path.exists(config_file):
             try:
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                with open(config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                     # 确保所有默认键都存在，防止旧配置文件缺少新设置
                     for section, defaults in DEFAULT_CONFIG.items():
@@ -42,21 +83,21 @@ class SysConfig:
                                     config[section][key] = value
                     return config
             except json.JSONDecodeError:
-                logger.error(f"Error decoding JSON from {CONFIG_FILE}. Using default config.")
+                logger.error(f"Error decoding JSON from {config_file}. Using default config.")
                 return DEFAULT_CONFIG
         else:
-            logger.info(f"{CONFIG_FILE} not found. Creating with default config.")
-            SysConfig.save_config(DEFAULT_CONFIG)
+            logger.info(f"{config_file} not found. Creating with default config.")
+            SysConfig.save_config(DEFAULT_CONFIG, config_file)
             return DEFAULT_CONFIG
 
     @staticmethod
-    def save_config(config):
+    def save_config(config, config_file=CONFIG_FILE):
         """保存配置到文件"""
         try:
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            with open(config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4)
-            # logger.info(f"Configuration saved to {CONFIG_FILE}")
+            # logger.info(f"Configuration saved to {config_file}")
         except Exception as e:
-            logger.error(f"Error saving configuration to {CONFIG_FILE}: {e}")
+            logger.error(f"Error saving configuration to {config_file}: {e}")
    
    
\ No newline at end of file
@@ -0,0 +1,227 @@
+import datetime
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+WORKER_LIMIT = Gauge('pdf_indexer_worker_limit', 'Current number of extraction workers allowed by the adaptive controller')
+BULK_LIMIT = Gauge('pdf_indexer_bulk_inflight_limit', 'Current number of concurrent bulk requests allowed')
+BULK_REJECTIONS = Counter('pdf_indexer_bulk_rejections_total', 'Bulk requests rejected by the cluster (HTTP 429)')
+READ_THROTTLE_SECONDS = Counter('pdf_indexer_read_throttle_seconds_total', 'Time workers waited for the read rate limit')
+
+
+class ResizableSemaphore:
+    """上限可以在运行时调整的信号量"""
+    def __init__(self, limit):
+        self._cond = threading.Condition()
+        self._limit = limit
+        self._in_use = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def set_limit(self, limit):
+        with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    def acquire(self, timeout=None):
+        """获取一个名额，超时返回 False；上限调小时已占用的名额不受影响，只是新的获取要等待"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._in_use < self._limit, timeout) and self._take()
+
+    def _take(self):
+        self._in_use += 1
+        return True
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+
+class RateLimiter:
+    """按字节数限速（例如 NAS 读取带宽），rate 为 0 表示不限速"""
+    def __init__(self, rate=0):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._next_free = 0.0
+
+    def reserve(self, amount):
+        """预约 amount 字节的额度，返回需要等待的秒数"""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + amount / self.rate
+            return start - now
+
+
+def _parse_hhmm(text):
+    hour, minute = text.split(':')
+    return datetime.time(int(hour), int(minute))
+
+
+class AdaptiveController:
+    """
+    AIMD 方式自适应调整提取并发数和同时进行的 bulk 请求数。
+
+    每隔 adjust_interval 秒根据上一段时间的信号调整一次：
+    - 出现 bulk 拒绝（HTTP 429）或 bulk 平均延迟超过目标值：并发数减半（乘性减）；
+    - 读取主要时间花在等待 NAS 限速上：保持不变，增加并发只会让更多线程排队；
+    - 否则并发数加一（加性增），直到上限。
+    上限来自配置，并可以按时间段（如白天门诊时间）覆盖，时间段可以跨越午夜。
+    """
+    def __init__(self, min_workers=1, max_workers=4, max_inflight_bulk=2, target_bulk_latency_ms=2000,
+                 max_read_bytes_per_sec=0, adjust_interval_seconds=5, windows=None):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.max_inflight_bulk = max(1, max_inflight_bulk)
+        self.target_bulk_latency = target_bulk_latency_ms / 1000
+        self.max_read_bytes_per_sec = max_read_bytes_per_sec
+        self.adjust_interval = adjust_interval_seconds
+        self.windows = [
+            dict(window, start=_parse_hhmm(window['start']), end=_parse_hhmm(window['end']))
+            for window in (windows or [])
+        ]
+
+        self._lock = threading.Lock()
+        self.workers = ResizableSemaphore(self.min_workers)
+        self.bulk = ResizableSemaphore(1)
+        self.read_limiter = RateLimiter(max_read_bytes_per_sec)
+        self._reset_window(time.monotonic())
+        self._apply_caps()
+
+    def _reset_window(self, now):
+        self._window_started = now
+        self._bulk_count = 0
+        self._bulk_latency_sum = 0.0
+        self._rejections = 0
+        self._files = 0
+        self._file_seconds = 0.0
+        self._read_wait = 0.0
+
+    def _current_caps(self, now=None):
+        """当前时间段生效的上限"""
+        caps = {
+            'max_workers': self.max_workers,
+            'max_inflight_bulk': self.max_inflight_bulk,
+            'max_read_bytes_per_sec': self.max_read_bytes_per_sec,
+        }
+        current = (now or datetime.datetime.now()).time()
+        for window in self.windows:
+            start, end = window['start'], window['end']
+            inside = start <= current < end if start <= end else (current >= start or current < end)
+            if inside:
+                caps.update({key: window[key] for key in caps if key in window})
+                break
+        return caps
+
+    def _apply_caps(self):
+        caps = self._current_caps()
+        self.read_limiter.rate = caps['max_read_bytes_per_sec']
+        max_workers = max(1, min(caps['max_workers'], self.max_workers))
+        workers = min(max(self.workers.limit, self.min_workers), max_workers)
+        bulk = min(self.bulk.limit, max(1, caps['max_inflight_bulk']))
+        self._set_limits(workers, bulk)
+        return caps
+
+    def _set_limits(self, workers, bulk):
+        if workers != self.workers.limit or bulk != self.bulk.limit:
+            logger.info(f"Adaptive concurrency: {workers} extraction workers, {bulk} concurrent bulk requests")
+        self.workers.set_limit(workers)
+        self.bulk.set_limit(bulk)
+        WORKER_LIMIT.set(workers)
+        BULK_LIMIT.set(bulk)
+
+    def throttle_read(self, size, stop_event):
+        """按 NAS 读取带宽限速，等待可以被 stop_event 打断"""
+        delay = self.read_limiter.reserve(size)
+        if delay > 0:
+            READ_THROTTLE_SECONDS.inc(delay)
+            with self._lock:
+                self._read_wait += delay
+            stop_event.wait(delay)
+
+    @contextmanager
+    def bulk_slot(self):
+        """限制同时进行的 bulk 请求数"""
+        self.bulk.acquire()
+        try:
+            yield
+        finally:
+            self.bulk.release()
+
+    def record_bulk(self, latency, rejected=False):
+        with self._lock:
+            self._bulk_count += 1
+            self._bulk_latency_sum += latency
+            if rejected:
+                self._rejections += 1
+        if rejected:
+            BULK_REJECTIONS.inc()
+        self.maybe_adjust()
+
+    def record_file(self, seconds):
+        with self._lock:
+            self._files += 1
+            self._file_seconds += seconds
+        self.maybe_adjust()
+
+    def maybe_adjust(self):
+        """距离上次调整超过 adjust_interval 秒时，按 AIMD 调整并发"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_started < self.adjust_interval:
+                return
+            bulk_count, rejections = self._bulk_count, self._rejections
+            avg_latency = self._bulk_latency_sum / bulk_count if bulk_count else 0.0
+            files, file_seconds, read_wait = self._files, self._file_seconds, self._read_wait
+            self._reset_window(now)
+
+            caps = self._apply_caps()
+            workers, bulk = self.workers.limit, self.bulk.limit
+            if rejections or avg_latency > self.target_bulk_latency:
+                workers = max(self.min_workers, workers // 2)
+                bulk = max(1, bulk // 2)
+                logger.info(f"Backing off: {rejections} bulk rejections, average bulk latency {avg_latency:.2f}s")
+            elif files and read_wait > 0.5 * file_seconds:
+                # 读取带宽已经是瓶颈
+                pass
+            elif files:
+                workers += 1
+                bulk += 1
+            # 时间段上限优先于 min_workers
+            workers = max(1, min(workers, caps['max_workers'], self.max_workers))
+            bulk = max(1, min(bulk, caps['max_inflight_bulk']))
+            self._set_limits(workers, bulk)
+
+
+def is_rejection(error):
+    """判断 bulk 异常是否为集群拒绝（HTTP 429，写线程池已满）"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    # helpers.bulk 的 BulkIndexError: args[1] 为失败条目列表
+    items = error.args[1] if len(getattr(error, 'args', ())) > 1 and isinstance(error.args[1], list) else []
+    return any(isinstance(item, dict) and any(
+        isinstance(result, dict) and result.get('status') == 429 for result in item.values()) for item in items)
+
+
+def create_controller(config):
+    """根据配置中的 throttle 节创建 AdaptiveController"""
+    throttle_config = config.get('throttle', {})
+    return AdaptiveController(
+        min_workers=throttle_config.get('min_workers', 1),
+        max_workers=throttle_config.get('max_workers', 4),
+        max_inflight_bulk=throttle_config.get('max_inflight_bulk', 2),
+        target_bulk_latency_ms=throttle_config.get('target_bulk_latency_ms', 2000),
+        max_read_bytes_per_sec=throttle_config.get('max_read_bytes_per_sec', 0),
+        adjust_interval_seconds=throttle_config.get('adjust_interval_seconds', 5),
+        windows=throttle_config.get('windows', []),
+    )
@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# newest: 修改时间最新的优先；smallest: 文件最小的优先；fifo: 按发现顺序
+POLICIES = ('newest', 'smallest', 'fifo')
+
+
+class PriorityWorkQueue:
+    """
+    有界优先队列，连接目录遍历（生产者）和索引工作线程（消费者）。
+
+    队列满时 put 阻塞，遍历随之暂停，而不是把整棵目录树缓存在内存中。
+    出队顺序：位于 pinned_directories 下的文件优先，其次按 policy 排序，相同时按发现顺序。
+    元素为 (path, mtime, size)。
+    """
+    def __init__(self, maxsize=1000, policy='newest', pinned_directories=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown work queue policy: {policy} (expected one of {', '.join(POLICIES)})")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.pinned_directories = [os.path.abspath(path) for path in (pinned_directories or [])]
+        self._cond = threading.Condition()
+        self._heap = []
+        self._counter = itertools.count()
+        self._closed = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap)
+
+    def is_pinned(self, path):
+        path = os.path.abspath(path)
+        return any(path == pinned or path.startswith(pinned + os.sep) for pinned in self.pinned_directories)
+
+    def _key(self, entry):
+        path, mtime, size = entry
+        if self.policy == 'newest':
+            order = -mtime
+        elif self.policy == 'smallest':
+            order = size
+        else:
+            order = 0
+        return (0 if self.is_pinned(path) else 1, order, next(self._counter))
+
+    def reopen(self):
+        """清空队列并重新打开，供下一次扫描使用"""
+        with self._cond:
+            self._heap = []
+            self._closed = False
+
+    def put(self, entry, timeout=None):
+        """加入一个文件，队列满时最多等待 timeout 秒，超时抛出 queue.Full"""
+        with self._cond:
+            if self.maxsize > 0 and not self._cond.wait_for(lambda: len(self._heap) < self.maxsize, timeout):
+                raise queue.Full
+            heapq.heappush(self._heap, (self._key(entry), entry))
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        取出优先级最高的文件。
+
+        Returns:
+            tuple 或 None: 队列已关闭且为空时返回 None；等待超过 timeout 秒抛出 queue.Empty。
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._heap or self._closed, timeout):
+                raise queue.Empty
+            if not self._heap:
+                return None
+            _, entry = heapq.heappop(self._heap)
+            self._cond.notify_all()
+            return entry
+
+    def close(self):
+        """生产者已结束，消费者取完剩余元素后 get 返回 None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def create_work_queue(config):
+    """根据配置中的 work_queue 节创建 PriorityWorkQueue"""
+    queue_config = config.get('work_queue', {})
+    return PriorityWorkQueue(
+        maxsize=queue_config.get('maxsize', 1000),
+        policy=queue_config.get('policy', 'newest'),
+        pinned_directories=queue_config.get('pinned_directories', []),
+    )
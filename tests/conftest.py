@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 源码是 src/ 下的扁平模块（与 python src/main.py 运行时相同的导入方式）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
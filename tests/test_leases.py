@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+import pytest
+
+from leases import LeaseManager, LeaseStore, SQLiteLeaseStore, create_lease_manager
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteLeaseStore(str(tmp_path / 'leases.db'))
+
+
+def _holder(store, file_path):
+    conn = sqlite3.connect(store.db_path)
+    try:
+        row = conn.execute("SELECT node_id FROM file_leases WHERE file_path = ?", (file_path,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def test_lease_store_is_abstract():
+    with pytest.raises(TypeError):
+        LeaseStore()
+
+
+def test_second_node_cannot_claim_a_held_lease(store):
+    assert store.claim('/nas/a.pdf', 'node-1', 60)
+    assert not store.claim('/nas/a.pdf', 'node-2', 60)
+    # 本节点再次 claim 自己持有的租约成功
+    assert store.claim('/nas/a.pdf', 'node-1', 60)
+    # 其他文件不受影响
+    assert store.claim('/nas/b.pdf', 'node-2', 60)
+    assert _holder(store, '/nas/a.pdf') == 'node-1'
+
+
+def test_released_lease_can_be_claimed_by_another_node(store):
+    assert store.claim('/nas/a.pdf', 'node-1', 60)
+    store.release('/nas/a.pdf', 'node-2') # 只能释放自己的租约
+    assert not store.claim('/nas/a.pdf', 'node-2', 60)
+    store.release('/nas/a.pdf', 'node-1')
+    assert store.claim('/nas/a.pdf', 'node-2', 60)
+
+
+def test_expired_lease_is_taken_over(store):
+    assert store.claim('/nas/a.pdf', 'node-1', 0.05)
+    assert not store.claim('/nas/a.pdf', 'node-2', 60)
+    time.sleep(0.1)
+    assert store.claim('/nas/a.pdf', 'node-2', 60)
+    assert _holder(store, '/nas/a.pdf') == 'node-2'
+    assert not store.claim('/nas/a.pdf', 'node-1', 60)
+
+
+def test_heartbeat_keeps_lease_alive(store):
+    assert store.claim('/nas/a.pdf', 'node-1', 0.2)
+    assert store.claim('/nas/b.pdf', 'node-1', 0.2)
+    time.sleep(0.1)
+    assert store.heartbeat('node-1', 60) == 2
+    time.sleep(0.15)
+    assert not store.claim('/nas/a.pdf', 'node-2', 60)
+
+
+def test_release_all_only_releases_own_leases(store):
+    assert store.claim('/nas/a.pdf', 'node-1', 60)
+    assert store.claim('/nas/b.pdf', 'node-2', 60)
+    store.release_all('node-1')
+    assert store.claim('/nas/a.pdf', 'node-3', 60)
+    assert not store.claim('/nas/b.pdf', 'node-3', 60)
+
+
+def test_manager_stop_releases_remaining_leases(store):
+    first = LeaseManager(store, 'node-1', lease_seconds=60)
+    second = LeaseManager(store, 'node-2', lease_seconds=60)
+    first.start()
+    first.start() # 两个根目录同时扫描
+    assert first.claim('/nas/a.pdf')
+    assert not second.claim('/nas/a.pdf')
+    first.stop()
+    assert not second.claim('/nas/a.pdf')
+    first.stop()
+    assert second.claim('/nas/a.pdf')
+
+
+def test_create_lease_manager(tmp_path):
+    assert create_lease_manager({}) is None
+    manager = create_lease_manager({'cluster': {'enabled': True, 'node_id': 'node-1', 'lease_seconds': 30},
+                                    'database': {'db_path': str(tmp_path / 'indexed.db')}})
+    assert (manager.node_id, manager.lease_seconds) == ('node-1', 30)
+    with pytest.raises(ValueError):
+        create_lease_manager({'cluster': {'enabled': True, 'backend': 'redis'}})
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+
+import pytest
+
+from db_manager import IndexedFileManager
+from file_scanner import FileScanner
+from pdf_processor import PDFProcessor
+from sqlite_search_client import SQLiteSearchClient
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    client = SQLiteSearchClient({'db_path': str(tmp_path / 'search.db')})
+    client.create_index()
+    # 不解析 PDF：每个文件的页面内容由测试指定
+    pages = {}
+    monkeypatch.setattr(PDFProcessor, 'extract_text_with_pdfminer_six',
+                        lambda self, pdf_path, should_stop=None: pages[pdf_path])
+    db = IndexedFileManager(str(tmp_path / 'indexed.db'))
+
+    def scan(tree):
+        FileScanner(db, PDFProcessor(client)).scan_and_index_directory(tree)
+
+    def documents():
+        conn = sqlite3.connect(client.db_path)
+        try:
+            return sorted(conn.execute(f"SELECT json_extract(source, '$.\"页内容\"') FROM {client._docs_table}"))
+        finally:
+            conn.close()
+
+    return pages, scan, documents
+
+
+def _write(path, pages, contents, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+    os.utime(path, (mtime, mtime))
+    pages[path] = [{'页号': number, '页内容': text} for number, text in enumerate(contents, 1)]
+
+
+def test_reindex_keeps_same_named_file_in_other_directory(tmp_path, env):
+    pages, scan, documents = env
+    tree = str(tmp_path / 'pdfs')
+    older = os.path.join(tree, '2023', '100000_病程记录.pdf')
+    newer = os.path.join(tree, '2024', '100000_病程记录.pdf')
+    _write(older, pages, ['2023 第一页'], 1000)
+    _write(newer, pages, ['2024 第一页'], 1000)
+    scan(tree)
+    assert documents() == [('2023 第一页',), ('2024 第一页',)]
+
+    _write(newer, pages, ['2024 修改后'], 2000)
+    scan(tree)
+    assert documents() == [('2023 第一页',), ('2024 修改后',)]
+    scan(tree)
+    assert documents() == [('2023 第一页',), ('2024 修改后',)]
+
+
+def test_reindex_removes_pages_dropped_from_modified_file(tmp_path, env):
+    pages, scan, documents = env
+    tree = str(tmp_path / 'pdfs')
+    path = os.path.join(tree, '100000_病程记录.pdf')
+    _write(path, pages, ['第一页', '第二页', '第三页'], 1000)
+    scan(tree)
+    assert len(documents()) == 3
+
+    _write(path, pages, ['新第一页'], 2000)
+    scan(tree)
+    assert documents() == [('新第一页',)]
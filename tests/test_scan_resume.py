@@ -0,0 +1,78 @@
+import os
+
+from db_manager import IndexedFileManager
+from file_scanner import FileScanner, _relative_parts, _subtree_done
+
+
+class RecordingProcessor:
+    """不解析 PDF，只记录被索引的文件"""
+    def __init__(self):
+        self.controller = None
+        self.indexed = []
+
+    def index_pdf(self, pdf_path, progress=None, should_stop=None, replace=False):
+        self.indexed.append(pdf_path)
+        return True
+
+
+def _touch(root, *parts):
+    path = os.path.join(root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+    return path
+
+
+def test_relative_parts(tmp_path):
+    root = str(tmp_path)
+    assert _relative_parts(root, root) == ()
+    assert _relative_parts(root, os.path.join(root, 'a', 'b')) == ('a', 'b')
+
+
+def test_subtree_done():
+    position = ('b', 'x')
+    assert _subtree_done(('a',), position)
+    assert _subtree_done(('a', 'z'), position)
+    # 包含断点位置的目录还没有遍历完
+    assert not _subtree_done(('b',), position)
+    assert not _subtree_done(('b', 'x'), position)
+    assert not _subtree_done(('b', 'y'), position)
+    assert not _subtree_done(('c',), position)
+
+
+def test_resume_skips_finished_subtrees(tmp_path):
+    tree = str(tmp_path / 'pdfs')
+    in_root = _touch(tree, '0.pdf')
+    pending = _touch(tree, 'a', '1.pdf')
+    walked = _touch(tree, 'b', 'x', '2.pdf')
+    remaining = [_touch(tree, 'b', 'y', '3.pdf'), _touch(tree, 'c', '4.pdf')]
+
+    db = IndexedFileManager(str(tmp_path / 'indexed.db'))
+    processor = RecordingProcessor()
+    scanner = FileScanner(db, processor)
+    # 上次扫描遍历到 b/x 后中断，a/1.pdf 已发现但还没有处理
+    root_key = os.path.abspath(tree)
+    scanner.checkpoints.start_session(root_key)
+    stat = os.stat(pending)
+    scanner.checkpoints.checkpoint_directory(root_key, ('b', 'x'), [(pending, stat.st_mtime, stat.st_size)])
+
+    scanner.scan_and_index_directory(tree)
+
+    assert sorted(processor.indexed) == sorted([pending] + remaining)
+    assert in_root not in processor.indexed and walked not in processor.indexed
+    # 扫描完成后会话结束，下次从头遍历
+    assert scanner.checkpoints.load_session(root_key) is None
+
+
+def test_rescan_after_finished_session_skips_indexed_files(tmp_path):
+    tree = str(tmp_path / 'pdfs')
+    files = [_touch(tree, 'a', '1.pdf'), _touch(tree, 'b', '2.pdf')]
+    db = IndexedFileManager(str(tmp_path / 'indexed.db'))
+
+    first = RecordingProcessor()
+    FileScanner(db, first).scan_and_index_directory(tree)
+    assert sorted(first.indexed) == sorted(files)
+
+    second = RecordingProcessor()
+    FileScanner(db, second).scan_and_index_directory(tree)
+    assert second.indexed == []
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+
+import pytest
+
+import scheduler
+from db_manager import IndexedFileManager
+from file_scanner import FileScanner
+from progress import ScanProgress
+from scheduler import RootScheduler, load_roots
+
+
+class RecordingProcessor:
+    """不解析 PDF，只记录被索引的文件"""
+    def __init__(self):
+        self.controller = None
+        self.indexed = []
+
+    def index_pdf(self, pdf_path, progress=None, should_stop=None, replace=False):
+        self.indexed.append(os.path.basename(pdf_path))
+        return True
+
+
+def _touch(root, *parts):
+    path = os.path.join(root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return path
+
+
+def _scan(tmp_path, tree, **kwargs):
+    processor = RecordingProcessor()
+    scanner = FileScanner(IndexedFileManager(str(tmp_path / 'indexed.db')), processor, **kwargs)
+    scanner.scan_and_index_directory(tree)
+    return sorted(processor.indexed)
+
+
+def test_exclude_prunes_directories(tmp_path, monkeypatch):
+    tree = str(tmp_path / 'pdfs')
+    _touch(tree, 'a.pdf')
+    _touch(tree, 'tmp', 'b.pdf')
+    _touch(tree, 'tmp', 'deep', 'c.pdf')
+    _touch(tree, 'keep', 'd.pdf')
+    walked = []
+    real_walk = os.walk
+
+    def recording_walk(top, *args, **kwargs):
+        for entry in real_walk(top, *args, **kwargs):
+            walked.append(os.path.relpath(entry[0], tree))
+            yield entry
+
+    monkeypatch.setattr(os, 'walk', recording_walk)
+    assert _scan(tmp_path, tree, exclude=['tmp']) == ['a.pdf', 'd.pdf']
+    # 被排除的目录整棵跳过，不进入遍历
+    assert 'tmp' not in walked and os.path.join('tmp', 'deep') not in walked
+
+
+def test_include_and_exclude_files(tmp_path):
+    tree = str(tmp_path / 'pdfs')
+    _touch(tree, 'today', 'a.pdf')
+    _touch(tree, 'today', 'a.draft.pdf')
+    _touch(tree, 'archive', 'b.pdf')
+    assert _scan(tmp_path, tree, include=['today/*'], exclude=['*.draft.pdf']) == ['a.pdf']
+
+
+def test_patterns_ignore_case(tmp_path):
+    tree = str(tmp_path / 'pdfs')
+    _touch(tree, 'A.PDF')
+    _touch(tree, 'b.pdf')
+    _touch(tree, 'Tmp', 'c.PDF')
+    assert _scan(tmp_path, tree, include=['*.pdf'], exclude=['TMP']) == ['A.PDF', 'b.pdf']
+
+
+def test_load_roots_defaults():
+    config = {'app_settings': {'pdf_directory': '/nas/pdfs', 'scan_interval_seconds': 120}}
+    assert load_roots(config) == [{'path': '/nas/pdfs', 'interval_seconds': 120, 'watch': False,
+                                   'include': [], 'exclude': [], 'worker_share': 1.0}]
+    assert load_roots({}) == [{'path': '', 'interval_seconds': 300, 'watch': False,
+                              'include': [], 'exclude': [], 'worker_share': 1.0}]
+
+
+def test_load_roots_from_config_and_overrides():
+    config = {'app_settings': {'pdf_directory': '/nas/pdfs', 'scan_interval_seconds': 120, 'roots': [
+        {'path': '/nas/archive', 'interval_seconds': 86400, 'exclude': ['tmp/*'], 'worker_share': 0.5},
+        {'path': '/nas/today', 'watch': True},
+    ]}}
+    roots = load_roots(config)
+    assert [(root['path'], root['interval_seconds'], root['watch']) for root in roots] == [
+        ('/nas/archive', 86400, False), ('/nas/today', 120, True)]
+    assert (roots[0]['exclude'], roots[0]['worker_share']) == (['tmp/*'], 0.5)
+    # 命令行 --dir/--interval 只扫描指定目录并覆盖间隔
+    assert [(root['path'], root['interval_seconds']) for root in load_roots(config, '/tmp/x', 5)] == [('/tmp/x', 5)]
+
+
+class FakeScanner:
+    """记录每次扫描的时间"""
+    def __init__(self, root):
+        self.root = root
+        self.progress = ScanProgress()
+        self.scans = []
+        self.stopped = False
+
+    def scan_and_index_directory(self, directory_path):
+        self.scans.append(time.monotonic())
+
+    def stop_scanning(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def run_scheduler(monkeypatch):
+    monkeypatch.setattr(scheduler, 'WATCH_DEBOUNCE_SECONDS', 0.01)
+    monkeypatch.setattr(scheduler, 'WATCH_POLL_SECONDS', 0.05)
+    monkeypatch.setattr(RootScheduler, '_start_watchers', lambda self: None)
+    started = []
+
+    def run(roots):
+        root_scheduler = RootScheduler(roots, FakeScanner)
+        thread = threading.Thread(target=root_scheduler.run, daemon=True)
+        thread.start()
+        started.append((root_scheduler, thread))
+        return root_scheduler, thread
+
+    yield run
+    for root_scheduler, thread in started:
+        root_scheduler.stop()
+        thread.join(5)
+
+
+def _root(path, interval, watch=False):
+    return {'path': path, 'interval_seconds': interval, 'watch': watch, 'include': [], 'exclude': [], 'worker_share': 1.0}
+
+
+def test_roots_follow_their_own_intervals(run_scheduler):
+    root_scheduler, _ = run_scheduler([_root('/hot', 0.05), _root('/cold', 60)])
+    time.sleep(0.5)
+    hot, cold = root_scheduler.scanners
+    assert len(hot.scans) >= 4
+    assert len(cold.scans) == 1
+
+
+def test_watched_root_without_notifications_is_polled(run_scheduler):
+    root_scheduler, _ = run_scheduler([_root('/today', 60, watch=True)])
+    time.sleep(0.5)
+    assert len(root_scheduler.scanners[0].scans) >= 4
+
+
+def test_wakeup_triggers_an_early_scan(run_scheduler):
+    root_scheduler, _ = run_scheduler([_root('/today', 60), _root('/archive', 60)])
+    time.sleep(0.1)
+    root_scheduler._wakeups[0].set()
+    time.sleep(0.2)
+    today, archive = root_scheduler.scanners
+    assert len(today.scans) == 2
+    assert len(archive.scans) == 1
+
+
+def test_stop_interrupts_waiting_roots(run_scheduler):
+    root_scheduler, thread = run_scheduler([_root('/a', 60), _root('/b', 60)])
+    time.sleep(0.1)
+    start = time.monotonic()
+    root_scheduler.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 1
+    assert all(scanner.stopped for scanner in root_scheduler.scanners)
+    assert root_scheduler.is_stopping()
@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from snapshot import MANIFEST_FILE, SNAPSHOT_FIELDS, SnapshotError, export_snapshot, import_snapshot, load_manifest
+from search_model import file_key
+from sqlite_search_client import SQLiteSearchClient
+
+
+def _client(tmp_path, name):
+    client = SQLiteSearchClient({'db_path': str(tmp_path / f'{name}.db'), 'index_name': 'medical_records'})
+    client.create_index()
+    return client
+
+
+def _page(file_name, page_no, content):
+    return {'患者名': '', '住院号': file_name.split('_')[0], '入院时间': '2026-01-01', '出院时间': '2026-01-02',
+            '文件类型': '病历.pdf', '文件目录': '', '文件名称': file_name, '文件标识': file_key(f'/nas/{file_name}'),
+            '页号': page_no, '页内容': content}
+
+
+@pytest.fixture
+def source(tmp_path):
+    client = _client(tmp_path, 'source')
+    actions = [{'_index': client.index_name, '_id': f'{name}-{page}', '_source': _page(f'{name}_病历.pdf', page, text)}
+               for name, page, text in [('A001', 1, '高血压 复查'), ('A001', 2, '血常规正常'),
+                                        ('B002', 1, 'chest x-ray'), ('C003', 1, '糖尿病')]]
+    # 旧版本写入的没有 _id 的文档
+    actions.append({'_index': client.index_name, '_source': _page('D004_病历.pdf', 1, '术后随访')})
+    assert client.bulk(actions) == (5, [])
+    return client
+
+
+def _documents(client):
+    return sorted((json.dumps(source, ensure_ascii=False, sort_keys=True) for _, source in client.iter_documents()))
+
+
+def test_export_import_round_trip(tmp_path, source):
+    snapshot_dir = str(tmp_path / 'snap')
+    manifest = export_snapshot(source, snapshot_dir, chunk_docs=2)
+    assert manifest['document_count'] == 5
+    assert [chunk['documents'] for chunk in manifest['chunks']] == [2, 2, 1]
+    assert manifest['fields'] == SNAPSHOT_FIELDS
+    assert load_manifest(snapshot_dir) == manifest
+
+    target = _client(tmp_path, 'target')
+    assert import_snapshot(target, snapshot_dir, streams=2, batch_size=2) == (5, 0)
+    assert _documents(target) == _documents(source)
+    assert sorted(doc_id for doc_id, _ in target.iter_documents() if doc_id) == ['A001-1', 'A001-2', 'B002-1', 'C003-1']
+    assert [hit['文件名称'] for hit in target.search('糖尿病')] == ['C003_病历.pdf']
+    assert target.suggest('a00') == [{'住院号': 'A001', '文件名称': 'A001_病历.pdf'}]
+
+    # 重复导入时有 _id 的文档被覆盖，不产生重复
+    import_snapshot(target, snapshot_dir)
+    assert len(_documents(target)) == 6
+
+
+def test_export_refuses_existing_snapshot(tmp_path, source):
+    snapshot_dir = str(tmp_path / 'snap')
+    export_snapshot(source, snapshot_dir)
+    with pytest.raises(SnapshotError):
+        export_snapshot(source, snapshot_dir)
+
+
+def test_import_requires_manifest(tmp_path):
+    os.makedirs(tmp_path / 'partial')
+    with pytest.raises(SnapshotError):
+        import_snapshot(_client(tmp_path, 'target'), str(tmp_path / 'partial'))
+
+
+def test_import_rejects_tampered_chunk(tmp_path, source):
+    snapshot_dir = str(tmp_path / 'snap')
+    manifest = export_snapshot(source, snapshot_dir)
+    with gzip.open(os.path.join(snapshot_dir, manifest['chunks'][0]['file']), 'at', encoding='utf-8') as f:
+        f.write(json.dumps({'_id': 'X', '_source': _page('X_病历.pdf', 1, 'x')}, ensure_ascii=False) + '\n')
+    with pytest.raises(SnapshotError):
+        import_snapshot(_client(tmp_path, 'target'), snapshot_dir)
+
+
+def test_import_counts_rejected_documents(tmp_path, source, monkeypatch):
+    snapshot_dir = str(tmp_path / 'snap')
+    export_snapshot(source, snapshot_dir, chunk_docs=2)
+    target = _client(tmp_path, 'target')
+    bulk = target.bulk
+    calls = []
+
+    def rejecting_bulk(actions, raise_on_error=True):
+        # 模拟集群拒绝单个文档（如映射冲突）：OSClient 在 raise_on_error=True 时会抛出 BulkIndexError
+        calls.append(raise_on_error)
+        rejected = [action for action in actions if action.get('_id') == 'B002-1']
+        success, errors = bulk([action for action in actions if action not in rejected])
+        return success, errors + [{'index': {'_id': action['_id'], 'error': 'mapper_parsing_exception'}}
+                                  for action in rejected]
+
+    monkeypatch.setattr(target, 'bulk', rejecting_bulk)
+    assert import_snapshot(target, snapshot_dir, streams=1) == (4, 1)
+    assert calls and not any(calls)
+    assert len(_documents(target)) == 4
+
+
+def test_manifest_written_last(tmp_path, source):
+    snapshot_dir = str(tmp_path / 'snap')
+    export_snapshot(source, snapshot_dir)
+    manifest_mtime = os.path.getmtime(os.path.join(snapshot_dir, MANIFEST_FILE))
+    chunk_mtimes = [os.path.getmtime(os.path.join(snapshot_dir, name))
+                    for name in os.listdir(snapshot_dir) if name != MANIFEST_FILE]
+    assert manifest_mtime >= max(chunk_mtimes)
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+
+import pytest
+
+import sqlite_search_client
+from search_model import file_key
+from sqlite_search_client import SQLiteSearchClient, build_match_query, segment_cjk
+
+
+def _page(file_name, page_no, content, admission_no='A001'):
+    return {
+        '患者名': '张三',
+        '住院号': admission_no,
+        '文件名称': file_name,
+        '文件标识': file_key(f'/nas/{file_name}'),
+        '页号': page_no,
+        '页内容': content,
+    }
+
+
+def _actions(pages):
+    return [{'_index': 'medical_records', '_id': f"{page['文件标识']}-{page['页号']}", '_source': page}
+            for page in pages]
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = SQLiteSearchClient({'db_path': str(tmp_path / 'search.db'), 'index_name': 'medical_records'})
+    client.create_index()
+    return client
+
+
+def _count(client):
+    conn = sqlite3.connect(client.db_path)
+    try:
+        docs = conn.execute(f"SELECT COUNT(*) FROM {client._docs_table}").fetchone()[0]
+        fts = conn.execute(f"SELECT COUNT(*) FROM {client._fts_table}").fetchone()[0]
+        return docs, fts
+    finally:
+        conn.close()
+
+
+def test_build_match_query():
+    assert segment_cjk('肺炎') == '肺\u200b炎\u200b'
+    assert build_match_query('肺炎 CT') == '"肺 炎" OR "CT"'
+    assert build_match_query('"') == '""""'
+    assert build_match_query('   ') == ''
+
+
+def test_cjk_phrase_search(client):
+    client.bulk(_actions([
+        _page('a.pdf', 1, '诊断：社区获得性肺炎，给予抗感染治疗。'),
+        _page('b.pdf', 1, '肺部CT未见异常，炎症指标正常。'),
+    ]))
+    results = client.search('肺炎')
+    # 短语匹配要求字符相邻，“肺”和“炎”分开出现的页面不算命中
+    assert [result['文件名称'] for result in results] == ['a.pdf']
+    assert '<mark>肺炎</mark>' in results[0]['content_snippet']
+    assert '\u200b' not in results[0]['content_snippet']
+    assert results[0]['score'] > 0
+    # 多个词之间为 OR
+    assert {result['文件名称'] for result in client.search('肺炎 异常')} == {'a.pdf', 'b.pdf'}
+
+
+@pytest.mark.parametrize('query', ['"', 'AND', '甲 OR', 'NEAR(', '*', '肺炎"', '-', '(', ')'])
+def test_query_syntax_input_is_safe(client, query):
+    client.bulk(_actions([_page('a.pdf', 1, '甲状腺功能检查 AND OR NEAR')]))
+    results = client.search(query)
+    assert isinstance(results, list)
+
+
+def test_query_operators_are_matched_as_words(client):
+    client.bulk(_actions([_page('a.pdf', 1, '甲状腺功能检查 AND 复查')]))
+    assert [result['文件名称'] for result in client.search('AND')] == ['a.pdf']
+    assert [result['文件名称'] for result in client.search('甲 OR')] == ['a.pdf']
+
+
+def test_migrates_table_created_before_admission_no(tmp_path):
+    db_path = tmp_path / 'search.db'
+    old_page = _page('旧病历.pdf', 1, '出院小结', admission_no='ZY2023001')
+    del old_page['文件标识']
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE medical_records_docs (
+            rowid INTEGER PRIMARY KEY,
+            doc_id TEXT UNIQUE,
+            file_name TEXT,
+            source TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_medical_records_file_name ON medical_records_docs (file_name)')
+    conn.execute("CREATE VIRTUAL TABLE medical_records_fts USING fts5(content, tokenize = 'unicode61')")
+    conn.execute('INSERT INTO medical_records_docs (doc_id, file_name, source) VALUES (?, ?, ?)',
+                 ('old-1', old_page['文件名称'], json.dumps(old_page, ensure_ascii=False)))
+    conn.execute('INSERT INTO medical_records_fts (rowid, content) VALUES (?, ?)', (1, segment_cjk(old_page['页内容'])))
+    conn.commit()
+    conn.close()
+
+    client = SQLiteSearchClient({'db_path': str(db_path), 'index_name': 'medical_records'})
+    client.create_index()
+    client.create_index() # 重复执行不出错
+
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(medical_records_docs)')]
+        row = conn.execute('SELECT admission_no, file_key FROM medical_records_docs').fetchone()
+    finally:
+        conn.close()
+    assert 'admission_no' in columns and 'file_key' in columns
+    assert row == ('ZY2023001', None)
+    assert client.suggest('zy2023') == [{'住院号': 'ZY2023001', '文件名称': '旧病历.pdf'}]
+    assert [result['文件名称'] for result in client.search('小结')] == ['旧病历.pdf']
+
+    # 迁移后新写入的文档可以按文件标识删除，旧文档保留
+    client.bulk(_actions([_page('新病历.pdf', 1, '入院记录')]))
+    assert client.delete_pdf('/nas/新病历.pdf') == 1
+    assert _count(client) == (1, 1)
+
+
+def test_bulk_rolls_back_when_database_is_locked(client, monkeypatch):
+    client.bulk(_actions([_page('a.pdf', 1, '第一页')]))
+    monkeypatch.setattr(sqlite_search_client, '_BUSY_TIMEOUT', 0.1)
+    locker = sqlite3.connect(client.db_path, isolation_level=None)
+    locker.execute('BEGIN EXCLUSIVE')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            client.bulk(_actions([_page('b.pdf', 1, '第二页'), _page('b.pdf', 2, '第三页')]))
+    finally:
+        locker.execute('ROLLBACK')
+        locker.close()
+    assert _count(client) == (1, 1)
+    # 写锁释放后可以继续写入
+    assert client.bulk(_actions([_page('b.pdf', 1, '第二页')])) == (1, [])
+    assert _count(client) == (2, 2)
+
+
+def test_bulk_rolls_back_partial_batch(client):
+    conn = sqlite3.connect(client.db_path)
+    conn.execute(f'DROP TABLE {client._fts_table}')
+    conn.commit()
+    conn.close()
+    # 文档表写入成功后全文索引写入失败，整批回滚
+    with pytest.raises(sqlite3.OperationalError):
+        client.bulk(_actions([_page('a.pdf', 1, '第一页')]))
+    conn = sqlite3.connect(client.db_path)
+    try:
+        assert conn.execute(f'SELECT COUNT(*) FROM {client._docs_table}').fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_bulk_reports_item_errors(client):
+    page = _page('a.pdf', 1, '第一页')
+    actions = _actions([page])
+    assert client.bulk(actions) == (1, [])
+    create = dict(actions[0], _op_type='create')
+    success, errors = client.bulk([create, {'_id': 'missing-source'}, *_actions([_page('b.pdf', 1, '第二页')])])
+    assert success == 1
+    assert [list(error)[0] for error in errors] == ['create', 'index']
+    assert errors[0]['create']['_id'] == actions[0]['_id']
+    assert _count(client) == (2, 2)
+
+
+def test_reindex_replaces_document(client):
+    client.bulk(_actions([_page('a.pdf', 1, '旧内容')]))
+    client.bulk(_actions([_page('a.pdf', 1, '新内容')]))
+    assert _count(client) == (1, 1)
+    assert client.search('旧内容') == []
+    assert [result['页内容'] for result in client.search('新内容')] == ['新内容']
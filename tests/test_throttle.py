@@ -0,0 +1,147 @@
+import datetime
+import threading
+
+import pytest
+
+from throttle import AdaptiveController, RateLimiter, ResizableSemaphore, create_controller, is_rejection
+
+
+def _controller(**kwargs):
+    # adjust_interval_seconds=0：每次记录都立即调整一次
+    kwargs.setdefault('adjust_interval_seconds', 0)
+    return AdaptiveController(**kwargs)
+
+
+def _limits(controller):
+    return controller.workers.limit, controller.bulk.limit
+
+
+def test_additive_increase_up_to_max():
+    controller = _controller(max_workers=3, max_inflight_bulk=2)
+    assert _limits(controller) == (1, 1)
+    controller.record_file(0.1)
+    assert _limits(controller) == (2, 2)
+    controller.record_file(0.1)
+    controller.record_file(0.1)
+    assert _limits(controller) == (3, 2)
+
+
+def _grow(controller, steps):
+    for _ in range(steps):
+        controller.record_file(0.1)
+
+
+def test_rejection_halves_concurrency():
+    controller = _controller(max_workers=8, max_inflight_bulk=4)
+    _grow(controller, 7)
+    assert _limits(controller) == (8, 4)
+    controller.record_bulk(0.1, rejected=True)
+    assert _limits(controller) == (4, 2)
+    controller.record_bulk(0.1, rejected=True)
+    assert _limits(controller) == (2, 1)
+
+
+def test_high_latency_halves_concurrency():
+    controller = _controller(max_workers=8, max_inflight_bulk=4, target_bulk_latency_ms=100)
+    _grow(controller, 7)
+    controller.record_bulk(0.05)
+    assert _limits(controller) == (8, 4)
+    controller.record_bulk(0.5)
+    assert _limits(controller) == (4, 2)
+
+
+def test_backoff_keeps_min_workers():
+    controller = _controller(min_workers=3, max_workers=8)
+    assert controller.workers.limit == 3
+    controller.record_bulk(0.1, rejected=True)
+    assert controller.workers.limit == 3
+
+
+def test_read_bound_workers_are_not_increased():
+    controller = _controller(max_workers=4, max_read_bytes_per_sec=1000)
+    stop = threading.Event()
+    stop.set() # 不真正等待
+    controller.throttle_read(1000, stop)
+    controller.throttle_read(1000, stop) # 第二次需要等待约 1 秒
+    controller.record_file(0.1)
+    assert controller.workers.limit == 1
+
+
+def test_window_caps_limit_growth(monkeypatch):
+    controller = _controller(max_workers=8, max_inflight_bulk=4)
+    _grow(controller, 3)
+    assert _limits(controller) == (4, 4)
+    night = {'max_workers': 2, 'max_inflight_bulk': 1, 'max_read_bytes_per_sec': 500}
+    monkeypatch.setattr(controller, '_current_caps', lambda now=None: night)
+    controller.record_file(0.1)
+    assert _limits(controller) == (2, 1)
+    assert controller.read_limiter.rate == 500
+
+
+@pytest.mark.parametrize('hour, minute, expected', [
+    (21, 59, 4), (22, 0, 1), (23, 30, 1), (0, 0, 1), (5, 59, 1), (6, 0, 4), (12, 0, 4),
+])
+def test_window_across_midnight(hour, minute, expected):
+    controller = _controller(max_workers=4, windows=[{'start': '22:00', 'end': '06:00', 'max_workers': 1}])
+    caps = controller._current_caps(datetime.datetime(2026, 1, 1, hour, minute))
+    assert caps['max_workers'] == expected
+    # 时间段未设置的上限使用全局配置
+    assert caps['max_inflight_bulk'] == 2
+
+
+@pytest.mark.parametrize('hour, expected', [(7, 4), (8, 1), (17, 1), (18, 4)])
+def test_daytime_window(hour, expected):
+    controller = _controller(max_workers=4, windows=[{'start': '08:00', 'end': '18:00', 'max_workers': 1}])
+    assert controller._current_caps(datetime.datetime(2026, 1, 1, hour, 0))['max_workers'] == expected
+
+
+def test_semaphore_shrinks_while_slots_are_held():
+    semaphore = ResizableSemaphore(3)
+    assert all(semaphore.acquire(timeout=0.05) for _ in range(3))
+    assert not semaphore.acquire(timeout=0.05)
+    semaphore.set_limit(1)
+    # 已占用的名额不受影响，释放到低于新上限之前不能再获取
+    semaphore.release()
+    assert not semaphore.acquire(timeout=0.05)
+    semaphore.release()
+    assert not semaphore.acquire(timeout=0.05)
+    semaphore.release()
+    assert semaphore.acquire(timeout=0.05)
+    assert not semaphore.acquire(timeout=0.05)
+
+
+def test_semaphore_growth_wakes_waiters():
+    semaphore = ResizableSemaphore(1)
+    assert semaphore.acquire(timeout=0.05)
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(semaphore.acquire(timeout=5)))
+    waiter.start()
+    semaphore.set_limit(2)
+    waiter.join(5)
+    assert acquired == [True]
+
+
+def test_rate_limiter():
+    assert RateLimiter(0).reserve(10 ** 9) == 0
+    limiter = RateLimiter(1000)
+    assert limiter.reserve(500) == 0
+    assert limiter.reserve(500) == pytest.approx(0.5, abs=0.05)
+    assert limiter.reserve(500) == pytest.approx(1.0, abs=0.05)
+
+
+class _StatusError(Exception):
+    status_code = 429
+
+
+def test_is_rejection():
+    assert is_rejection(_StatusError())
+    assert is_rejection(Exception('2 document(s) failed to index.', [{'index': {'_id': '1', 'status': 429}}]))
+    assert not is_rejection(Exception('2 document(s) failed to index.', [{'index': {'_id': '1', 'status': 400}}]))
+    assert not is_rejection(ValueError('boom'))
+
+
+def test_create_controller_from_config():
+    controller = create_controller({'throttle': {'min_workers': 2, 'max_workers': 6, 'max_inflight_bulk': 3,
+                                                 'windows': [{'start': '22:00', 'end': '06:00', 'max_workers': 1}]}})
+    assert (controller.min_workers, controller.max_workers, controller.max_inflight_bulk) == (2, 6, 3)
+    assert controller.windows[0]['start'] == datetime.time(22, 0)
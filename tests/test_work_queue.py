@@ -0,0 +1,88 @@
+import os
+import queue
+
+import pytest
+
+from work_queue import PriorityWorkQueue, create_work_queue
+
+# (path, mtime, size)
+OLD_BIG = ('/data/old_big.pdf', 100.0, 9000)
+NEW_MEDIUM = ('/data/new_medium.pdf', 300.0, 5000)
+MID_SMALL = ('/data/mid_small.pdf', 200.0, 10)
+
+
+def _drain(work_queue):
+    work_queue.close()
+    entries = []
+    while True:
+        entry = work_queue.get(timeout=1)
+        if entry is None:
+            return entries
+        entries.append(entry)
+
+
+def _fill(work_queue, entries):
+    for entry in entries:
+        work_queue.put(entry, timeout=1)
+    return work_queue
+
+
+@pytest.mark.parametrize('policy, expected', [
+    ('newest', [NEW_MEDIUM, MID_SMALL, OLD_BIG]),
+    ('smallest', [MID_SMALL, NEW_MEDIUM, OLD_BIG]),
+    ('fifo', [OLD_BIG, NEW_MEDIUM, MID_SMALL]),
+])
+def test_order_by_policy(policy, expected):
+    work_queue = _fill(PriorityWorkQueue(policy=policy), [OLD_BIG, NEW_MEDIUM, MID_SMALL])
+    assert _drain(work_queue) == expected
+
+
+@pytest.mark.parametrize('policy', ['newest', 'smallest', 'fifo'])
+def test_pinned_directories_come_first(policy):
+    pinned = (os.path.abspath('/today/a.pdf'), 1.0, 1000000)
+    work_queue = PriorityWorkQueue(policy=policy, pinned_directories=['/today'])
+    _fill(work_queue, [OLD_BIG, NEW_MEDIUM, pinned, MID_SMALL])
+    assert _drain(work_queue)[0] == pinned
+
+
+def test_pinned_matches_whole_directory_names():
+    work_queue = PriorityWorkQueue(pinned_directories=['/today'])
+    assert work_queue.is_pinned('/today/sub/a.pdf')
+    assert not work_queue.is_pinned('/today2/a.pdf')
+
+
+def test_equal_keys_keep_discovery_order():
+    entries = [(f'/data/{i}.pdf', 100.0, 10) for i in range(5)]
+    work_queue = _fill(PriorityWorkQueue(policy='newest'), entries)
+    assert _drain(work_queue) == entries
+
+
+def test_full_queue_blocks_put_until_an_entry_is_taken():
+    work_queue = _fill(PriorityWorkQueue(maxsize=2, policy='fifo'), [OLD_BIG, NEW_MEDIUM])
+    with pytest.raises(queue.Full):
+        work_queue.put(MID_SMALL, timeout=0.05)
+    assert len(work_queue) == 2
+    assert work_queue.get(timeout=1) == OLD_BIG
+    work_queue.put(MID_SMALL, timeout=0.05)
+    assert _drain(work_queue) == [NEW_MEDIUM, MID_SMALL]
+
+
+def test_get_times_out_while_open_and_returns_none_after_close():
+    work_queue = PriorityWorkQueue()
+    with pytest.raises(queue.Empty):
+        work_queue.get(timeout=0.05)
+    work_queue.close()
+    assert work_queue.get(timeout=0.05) is None
+    work_queue.reopen()
+    with pytest.raises(queue.Empty):
+        work_queue.get(timeout=0.05)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PriorityWorkQueue(policy='largest')
+
+
+def test_create_work_queue_from_config():
+    work_queue = create_work_queue({'work_queue': {'maxsize': 5, 'policy': 'smallest'}})
+    assert (work_queue.maxsize, work_queue.policy) == (5, 'smallest')